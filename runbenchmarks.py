@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+"""
+Compares the time taken to render index view rows using the compiled
+`list_display` columns with the time taken resolving every cell with
+`lookup_field()`. Timings depend on the machine, so this is run by hand
+rather than as part of the test suite.
+"""
+from __future__ import print_function
+
+import datetime
+import os
+import timeit
+
+import django
+
+
+os.environ['DJANGO_SETTINGS_MODULE'] = 'wagtailmodeladmin.tests.settings'
+
+
+def benchmark_columns(rows=200, repeat=5):
+    from wagtailmodeladmin.templatetags.wagtailmodeladmin_tags import (
+        items_for_result)
+    from wagtailmodeladmin.tests.test_columns import (
+        ColumnsBookModelAdmin, View, items_for_result_by_lookup)
+    from wagtailmodeladmin.tests.testapp.models import Author, Book
+
+    author = Author.objects.create(
+        name='Author', date_of_birth=datetime.date(1950, 1, 1))
+    for i in range(rows):
+        Book.objects.create(author=author, title='Book %d' % i)
+    books = list(Book.objects.select_related('author'))
+    view = View(ColumnsBookModelAdmin())
+
+    def per_row(render_cells):
+        def render():
+            for book in books:
+                list(render_cells(view, book))
+        best = min(timeit.repeat(render, number=1, repeat=repeat))
+        return best / len(books) * 1000000
+
+    by_lookup = per_row(items_for_result_by_lookup)
+    compiled = per_row(items_for_result)
+    print('Rendering %d rows of %d columns (best of %d):' % (
+        len(books), len(view.list_display), repeat))
+    print('  lookup_field():    %.1f us per row' % by_lookup)
+    print('  compiled columns:  %.1f us per row (%.0f%%)' % (
+        compiled, compiled / by_lookup * 100))
+
+
+def runbenchmarks():
+    django.setup()
+    from django.db import connection
+    connection.creation.create_test_db(verbosity=0)
+    try:
+        benchmark_columns()
+    finally:
+        connection.creation.destroy_test_db(':memory:', verbosity=0)
+
+
+if __name__ == '__main__':
+    runbenchmarks()
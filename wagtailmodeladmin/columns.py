@@ -0,0 +1,192 @@
+from __future__ import unicode_literals
+import datetime
+
+import django
+from django.db import models
+from django.db.models.fields import FieldDoesNotExist
+from django.utils import six
+from django.utils.encoding import force_text
+from django.utils.html import conditional_escape
+from django.utils.safestring import mark_safe
+from django.core.exceptions import ObjectDoesNotExist
+
+from django.contrib.admin.utils import (
+    _get_non_gfk_field, display_for_field, display_for_value,
+)
+
+COLUMN_FIELD = 'field'
+COLUMN_ADMIN_METHOD = 'admin_method'
+COLUMN_CALLABLE = 'callable'
+COLUMN_MODEL_ATTR = 'model_attr'
+
+# The signatures of these changed in Django 1.9, so pick the right way of
+# calling them once, rather than for every cell
+if django.VERSION >= (1, 9):
+    def _display_for_value(value, empty_value_display, boolean):
+        return display_for_value(value, empty_value_display, boolean)
+
+    def _display_for_field(value, field, empty_value_display):
+        return display_for_field(value, field, empty_value_display)
+else:
+    def _display_for_value(value, empty_value_display, boolean):
+        return display_for_value(value, boolean)
+
+    def _display_for_field(value, field, empty_value_display):
+        return display_for_field(value, field)
+
+
+def _is_overridden(model_admin, method_name):
+    from .options import ModelAdmin
+    method = six.get_unbound_function(getattr(type(model_admin), method_name))
+    default = six.get_unbound_function(getattr(ModelAdmin, method_name))
+    return method is not default
+
+
+class Column(object):
+    """
+    Everything needed to render the cells of a single `list_display` column,
+    worked out once, so that rendering a cell doesn't involve resolving
+    `field_name` again (as `lookup_field` does)
+    """
+
+    def __init__(self, model_admin, field_name):
+        self.model_admin = model_admin
+        self.field_name = field_name
+        self.field = None
+        self.attr = None
+        self.default_empty_value_display = (
+            model_admin.get_empty_value_display())
+        self.classes = ['field-%s' % field_name]
+        try:
+            self.field = _get_non_gfk_field(model_admin.opts, field_name)
+        except FieldDoesNotExist:
+            if callable(field_name):
+                self.kind = COLUMN_CALLABLE
+                self.attr = field_name
+            elif (
+                hasattr(model_admin, field_name) and
+                field_name not in ('__str__', '__unicode__')
+            ):
+                self.kind = COLUMN_ADMIN_METHOD
+                self.attr = getattr(model_admin, field_name)
+            else:
+                # The attribute can only be read from each object
+                self.kind = COLUMN_MODEL_ATTR
+        else:
+            self.kind = COLUMN_FIELD
+
+        self.display_as_value = self.field is None or self.field.auto_created
+        if self.attr is not None:
+            self.value_options = self.get_value_options(self.attr)
+        if not self.display_as_value and isinstance(
+            self.field, (models.DateField, models.TimeField, models.ForeignKey)
+        ):
+            self.classes.append('nowrap')
+        self.has_extra_classes = _is_overridden(
+            model_admin, 'get_extra_class_names_for_field_col')
+        self.has_extra_attrs = _is_overridden(
+            model_admin, 'get_extra_attrs_for_field_col')
+
+    def get_value_options(self, attr):
+        """
+        Returns an `(empty_value_display, allow_tags, boolean)` tuple for
+        values returned by `attr`
+        """
+        return (
+            getattr(attr, 'empty_value_display',
+                    self.default_empty_value_display),
+            getattr(attr, 'allow_tags', False),
+            getattr(attr, 'boolean', False),
+        )
+
+    def get_value(self, obj):
+        """
+        Returns an `(attr, value)` tuple for `obj`, as `lookup_field` would
+        """
+        if self.kind == COLUMN_FIELD:
+            return None, getattr(obj, self.field_name)
+        if self.kind == COLUMN_MODEL_ATTR:
+            attr = getattr(obj, self.field_name)
+            if callable(attr):
+                return attr, attr()
+            return attr, attr
+        return self.attr, self.attr(obj)
+
+    def render(self, obj):
+        """
+        Returns a `(result_repr, classes)` tuple for `obj`
+        """
+        classes = self.classes
+        try:
+            attr, value = self.get_value(obj)
+        except ObjectDoesNotExist:
+            return self.default_empty_value_display, classes
+
+        if self.display_as_value:
+            if self.attr is not None:
+                empty_value_display, allow_tags, boolean = self.value_options
+            else:
+                empty_value_display, allow_tags, boolean = (
+                    self.get_value_options(attr))
+            if boolean or not value:
+                allow_tags = True
+            result_repr = _display_for_value(
+                value, empty_value_display, boolean)
+            # Strip HTML tags in the resulting text, except if the
+            # function has an "allow_tags" attribute set to True.
+            if allow_tags:
+                result_repr = mark_safe(result_repr)
+            if isinstance(value, (datetime.date, datetime.time)):
+                classes = classes + ['nowrap']
+        else:
+            result_repr = _display_for_field(
+                value, self.field, self.default_empty_value_display)
+
+        if force_text(result_repr) == '':
+            result_repr = mark_safe('&nbsp;')
+        return result_repr, classes
+
+    def render_cell(self, obj, extra_content=''):
+        """
+        Returns the `<td>` element for `obj`, with `extra_content` (e.g.
+        action buttons) added after the value
+        """
+        result_repr, classes = self.render(obj)
+        model_admin = self.model_admin
+        if self.has_extra_classes:
+            classes = classes + list(
+                model_admin.get_extra_class_names_for_field_col(
+                    obj, self.field_name))
+        if self.has_extra_attrs:
+            attrs = dict(model_admin.get_extra_attrs_for_field_col(
+                obj, self.field_name))
+            attrs['class'] = ' '.join(classes)
+            row_attributes = ''.join(
+                ' %s="%s"' % (key, val) for key, val in attrs.items())
+        else:
+            row_attributes = ' class="%s"' % ' '.join(classes)
+        # This is called for every cell, so avoid `format_html()` escaping
+        # the (already safe) attributes and empty `extra_content` each time
+        if extra_content:
+            result_repr = '%s%s' % (
+                conditional_escape(result_repr),
+                conditional_escape(extra_content))
+        else:
+            result_repr = conditional_escape(result_repr)
+        return mark_safe('<td%s>%s</td>' % (row_attributes, result_repr))
+
+
+def get_columns(model_admin, list_display):
+    """
+    Returns a list of `Column` objects for `list_display`, which are created
+    once per model_admin (for each value of `list_display`) and reused for
+    every request
+    """
+    try:
+        plans = model_admin._column_plans
+    except AttributeError:
+        plans = model_admin._column_plans = {}
+    key = tuple(list_display)
+    if key not in plans:
+        plans[key] = [Column(model_admin, f) for f in list_display]
+    return plans[key]
@@ -0,0 +1,213 @@
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+from django.db.models import Count
+from django.db.models.signals import post_save, post_delete
+from django.utils.encoding import force_bytes, force_text
+
+COUNT_EXACT = 'exact'
+COUNT_CACHED = 'cached'
+COUNT_ESTIMATE = 'estimate'
+COUNT_CAPPED = 'capped'
+COUNT_STRATEGIES = (COUNT_EXACT, COUNT_CACHED, COUNT_ESTIMATE, COUNT_CAPPED)
+
+
+class RowCount(int):
+    """
+    An `int` that also knows whether it is an exact count of rows, or just an
+    estimate/lower bound. It can be used anywhere a plain count was used
+    before (e.g. in templates), with `exact` and `capped` available for
+    more informative output.
+    """
+
+    def __new__(cls, value, exact=True, capped=False):
+        obj = super(RowCount, cls).__new__(cls, value)
+        obj.exact = exact
+        obj.capped = capped
+        return obj
+
+
+def get_generation_cache_key(model):
+    return 'wagtailmodeladmin:count:%s.%s' % (
+        model._meta.app_label, model._meta.model_name)
+
+
+def invalidate_cached_counts(sender, **kwargs):
+    """
+    Invalidates all cached counts for `sender` in one go, by changing the
+    'generation' value that forms part of every count cache key.
+    """
+    key = get_generation_cache_key(sender)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # The key has expired or doesn't exist yet
+        cache.set(key, 1, None)
+
+
+def get_signature_cache_key(model_admin, signature):
+    """
+    Returns a cache key for a value derived from `model_admin`'s model and a
+    JSON-serialisable `signature`, which changes whenever an instance of the
+    model is saved or deleted (see `connect_count_invalidation`)
+    """
+    generation = get_generation(model_admin.model)
+    digest = hashlib.md5(force_bytes(
+        json.dumps(signature, sort_keys=True))).hexdigest()
+    return '%s:%s:%s:%s' % (
+        get_generation_cache_key(model_admin.model),
+        model_admin.__class__.__name__, generation, digest)
+
+
+def get_generation(model):
+    """
+    Returns the current 'generation' value for `model`, which changes
+    whenever an instance of it is saved or deleted (see
+    `connect_count_invalidation`)
+    """
+    generation_key = get_generation_cache_key(model)
+    generation = cache.get(generation_key)
+    if generation is None:
+        generation = 0
+        cache.add(generation_key, generation, None)
+    return generation
+
+
+def connect_count_invalidation(model):
+    uid = 'wagtailmodeladmin_count_invalidation_%s' % (
+        get_generation_cache_key(model))
+    post_save.connect(invalidate_cached_counts, sender=model,
+                      dispatch_uid=uid)
+    post_delete.connect(invalidate_cached_counts, sender=model,
+                        dispatch_uid=uid)
+
+
+class RowCounter(object):
+    """
+    Counts the rows in querysets for IndexView, using the strategy specified
+    by `count_strategy` on the supplied model_admin:
+
+    `exact` - A `COUNT(*)` query is run every time (the default).
+
+    `cached` - Counts are cached for `count_cache_timeout` seconds, keyed by
+    the supplied signature, and invalidated whenever an instance of the model
+    is saved or deleted.
+
+    `estimate` - The row count estimated by the database's query planner is
+    used (supported for PostgreSQL and MySQL). Estimates lower than
+    `count_estimate_threshold` are replaced with an exact count.
+
+    `capped` - Rows are counted up to `count_cap` only, so that the count
+    can be reported as 'more than N' for large result sets.
+    """
+
+    def __init__(self, model_admin):
+        self.model_admin = model_admin
+        self.model = model_admin.model
+        self.strategy = model_admin.count_strategy
+        if self.strategy not in COUNT_STRATEGIES:
+            raise ImproperlyConfigured(
+                u"The `count_strategy` attribute on your `%s` class must be "
+                "one of: %s." % (model_admin.__class__.__name__,
+                                 ', '.join(COUNT_STRATEGIES)))
+
+    def count(self, queryset, signature=None):
+        """
+        Return a `RowCount` for `queryset`. `signature` should be a
+        JSON-serialisable value that uniquely identifies the filters/search
+        applied to `queryset` (only used by the `cached` strategy).
+        """
+        if self.strategy == COUNT_CACHED:
+            return self.get_cached_count(queryset, signature)
+        if self.strategy == COUNT_ESTIMATE:
+            return self.get_estimated_count(queryset)
+        if self.strategy == COUNT_CAPPED:
+            return self.get_capped_count(queryset)
+        return RowCount(queryset.count())
+
+    def get_cached_count(self, queryset, signature=None):
+        key = get_signature_cache_key(self.model_admin, signature)
+        count = cache.get(key)
+        if count is None:
+            count = queryset.count()
+            cache.set(key, count, self.model_admin.count_cache_timeout)
+        return RowCount(count)
+
+    def get_capped_count(self, queryset):
+        cap = self.model_admin.count_cap
+        count = queryset.order_by()[:cap + 1].count()
+        if count > cap:
+            return RowCount(cap, exact=False, capped=True)
+        return RowCount(count)
+
+    def get_estimated_count(self, queryset):
+        connection = connections[queryset.db]
+        estimate = None
+        if connection.vendor == 'postgresql':
+            estimate = self._postgresql_estimate(queryset, connection)
+        elif connection.vendor == 'mysql' and not queryset.query.where:
+            estimate = self._mysql_table_estimate(queryset, connection)
+        threshold = self.model_admin.count_estimate_threshold
+        if estimate is None or estimate < threshold:
+            # Planner statistics are unreliable for small tables (and not
+            # available at all for some backends) so count these exactly.
+            return RowCount(queryset.count())
+        return RowCount(estimate, exact=False)
+
+    def _postgresql_estimate(self, queryset, connection):
+        sql, params = queryset.order_by().query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+            plan = cursor.fetchone()[0]
+        if not isinstance(plan, list):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+
+    def _mysql_table_estimate(self, queryset, connection):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT TABLE_ROWS FROM information_schema.TABLES '
+                'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s',
+                [queryset.model._meta.db_table])
+            row = cursor.fetchone()
+        if row is None or row[0] is None:
+            return None
+        return int(row[0])
+
+
+def normalise_facet_value(value):
+    """
+    Converts a value from the database into the form it takes in a list
+    filter's query string, so that the two can be compared
+    """
+    if value is None:
+        return None
+    if value is True or value is False:
+        return '1' if value else '0'
+    return force_text(value)
+
+
+def get_facet_counts(model_admin, get_queryset, group_by, signature=None):
+    """
+    Returns a dictionary mapping each distinct value of `group_by` in the
+    queryset returned by `get_queryset()` to the number of matching rows,
+    calculated with a single `GROUP BY` query and cached for
+    `count_cache_timeout` seconds per `signature` (invalidated whenever the
+    model is saved or deleted). The queryset is only built when the counts
+    aren't cached. Keys are normalised with `normalise_facet_value`.
+    """
+    key = get_signature_cache_key(
+        model_admin, ['facets', group_by, signature])
+    counts = cache.get(key)
+    if counts is None:
+        rows = get_queryset().order_by().values_list(group_by).annotate(
+            facet_count=Count('pk', distinct=True))
+        counts = {}
+        for value, count in rows:
+            value = normalise_facet_value(value)
+            counts[value] = counts.get(value, 0) + count
+        cache.set(key, counts, model_admin.count_cache_timeout)
+    return counts
@@ -0,0 +1,443 @@
+import csv
+import json
+import multiprocessing
+import os
+import pickle
+import re
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.admin.utils import label_for_field, lookup_field
+from django.core.exceptions import ImproperlyConfigured, ObjectDoesNotExist
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections, models
+from django.utils import six
+from django.utils.crypto import constant_time_compare, salted_hmac
+from django.utils.encoding import force_bytes, force_text
+from django.utils.module_loading import import_string
+
+from .pagination import KeysetPaginator
+from .workers import init_worker
+
+EXPORT_CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+JOB_PENDING = 'pending'
+JOB_RUNNING = 'running'
+JOB_COMPLETE = 'complete'
+JOB_FAILED = 'failed'
+
+
+class Echo(object):
+    """
+    A file-like object that just returns what is written to it, so that
+    `csv.writer` can be used to generate rows one at a time
+    """
+
+    def write(self, value):
+        return value
+
+
+class ExportRenderer(object):
+    """
+    Renders model instances as lines of CSV or JSON lines output, with values
+    for each of `fields` (which may be anything supported by `list_display`)
+    """
+
+    def __init__(self, model_admin, fields, export_format):
+        self.model_admin = model_admin
+        self.model = model_admin.model
+        self.fields = fields
+        self.export_format = export_format
+        self.csv_writer = csv.writer(Echo())
+
+    def get_field_key(self, field_name):
+        if callable(field_name):
+            return field_name.__name__
+        return field_name
+
+    def get_field_label(self, field_name):
+        return force_text(
+            label_for_field(field_name, self.model, self.model_admin))
+
+    def get_value(self, obj, field_name):
+        try:
+            f, attr, value = lookup_field(field_name, obj, self.model_admin)
+        except (AttributeError, ObjectDoesNotExist):
+            return None
+        if isinstance(value, models.Model):
+            return force_text(value)
+        return value
+
+    def encode_csv_value(self, value):
+        value = '' if value is None else force_text(value)
+        if six.PY2:
+            return force_bytes(value)
+        return value
+
+    def render_header(self):
+        """
+        Returns the line that should begin the output (if any)
+        """
+        if self.export_format == 'csv':
+            return self.csv_writer.writerow([
+                self.encode_csv_value(self.get_field_label(f))
+                for f in self.fields])
+        return ''
+
+    def render_row(self, obj):
+        values = [self.get_value(obj, f) for f in self.fields]
+        if self.export_format == 'csv':
+            return self.csv_writer.writerow(
+                [self.encode_csv_value(v) for v in values])
+        keys = [self.get_field_key(f) for f in self.fields]
+        return json.dumps(
+            dict(zip(keys, values)), cls=DjangoJSONEncoder) + '\n'
+
+    def iter_lines(self, objects, header=True):
+        if header:
+            line = self.render_header()
+            if line:
+                yield line
+        for obj in objects:
+            yield self.render_row(obj)
+
+
+def iter_queryset_in_chunks(queryset, chunk_size):
+    """
+    Yields every object in `queryset`, fetching them in chunks using a
+    `KeysetPaginator` (or the queryset's own iterator, if the ordering can't
+    be used for keyset pagination), so that memory use stays constant
+    """
+    if not KeysetPaginator.supports_queryset(queryset):
+        for obj in queryset.iterator():
+            yield obj
+        return
+    paginator = KeysetPaginator(queryset, chunk_size)
+    page_obj = paginator.page()
+    while True:
+        for obj in page_obj.object_list:
+            yield obj
+        if not page_obj.has_next():
+            break
+        page_obj = paginator.page(page_obj.next_cursor())
+
+
+def get_export_root():
+    return getattr(
+        settings, 'WAGTAILMODELADMIN_EXPORT_ROOT',
+        os.path.join(tempfile.gettempdir(), 'wagtailmodeladmin_exports'))
+
+
+def get_export_job_expiry():
+    """
+    Returns the number of seconds after which inactive export jobs (and
+    their files) are deleted
+    """
+    return getattr(settings, 'WAGTAILMODELADMIN_EXPORT_JOB_EXPIRY', 86400)
+
+
+def get_export_job_timeout():
+    """
+    Returns the number of seconds a pending or running export job can go
+    without making progress before it is considered to have failed (e.g.
+    because the process running it was restarted)
+    """
+    return getattr(settings, 'WAGTAILMODELADMIN_EXPORT_JOB_TIMEOUT', 3600)
+
+
+def ensure_export_root():
+    """
+    Creates the directory that export jobs are stored in, if necessary, and
+    checks that it belongs to the current (system) user and can't be written
+    to by anyone else
+    """
+    root = get_export_root()
+    try:
+        os.makedirs(root, 0o700)
+    except OSError:
+        if not os.path.isdir(root):
+            raise
+    if hasattr(os, 'getuid'):
+        stat = os.stat(root)
+        if stat.st_uid != os.getuid() or stat.st_mode & 0o022:
+            raise ImproperlyConfigured(
+                u"The export directory '%s' must belong to the user running "
+                "Django, and must not be writable by other users. Set "
+                "WAGTAILMODELADMIN_EXPORT_ROOT to use a different "
+                "directory." % root)
+    return root
+
+
+def sign_spec(data):
+    return force_bytes(salted_hmac(
+        'wagtailmodeladmin.exports.ExportJob', data).hexdigest())
+
+
+class ExportJob(object):
+    """
+    An export of a ModelAdmin listing that is rendered in the background.
+
+    Everything needed to run the job (the model_admin class, the query for
+    the filtered/searched/ordered results, the fields and the format) is
+    saved to a directory under `WAGTAILMODELADMIN_EXPORT_ROOT` when the job is
+    created, so that the job can be run by a different thread or process.
+    The saved spec is signed, and is only loaded if the signature matches.
+    The results are split into chunks, which are rendered to separate files
+    (possibly in parallel) and then assembled into the final file.
+
+    Jobs that make no progress for `WAGTAILMODELADMIN_EXPORT_JOB_TIMEOUT`
+    seconds are marked as failed, and jobs are deleted once they have been
+    inactive for `WAGTAILMODELADMIN_EXPORT_JOB_EXPIRY` seconds.
+    """
+    id_re = re.compile(r'^[0-9a-f]{32}$')
+
+    def __init__(self, job_id):
+        self.id = job_id
+        self.path = os.path.join(get_export_root(), job_id)
+
+    @classmethod
+    def create(cls, model_admin, queryset, fields, export_format, user):
+        ensure_export_root()
+        cls.delete_expired()
+        job = cls(uuid.uuid4().hex)
+        os.makedirs(job.path, 0o700)
+        model_admin_class = model_admin.__class__
+        spec = {
+            'model_admin': '%s.%s' % (
+                model_admin_class.__module__, model_admin_class.__name__),
+            'model': model_admin.opts.label_lower,
+            'query': queryset.query,
+            'fields': list(fields),
+            'format': export_format,
+            'chunk_size': model_admin.export_chunk_size,
+        }
+        data = pickle.dumps(spec, pickle.HIGHEST_PROTOCOL)
+        with open(os.path.join(job.path, 'job.pickle'), 'wb') as f:
+            f.write(sign_spec(data) + b'\n' + data)
+        job.save_status(
+            status=JOB_PENDING, user_id=user.pk, format=export_format,
+            filename='%s.%s' % (model_admin.opts.model_name, export_format),
+            chunks=None)
+        return job
+
+    @classmethod
+    def get(cls, job_id):
+        """
+        Returns the job with the supplied id, or `None` if it doesn't exist
+        (or has expired)
+        """
+        if not job_id or not cls.id_re.match(job_id):
+            return None
+        job = cls(job_id)
+        if not os.path.exists(os.path.join(job.path, 'status.json')):
+            return None
+        if job.is_expired():
+            return None
+        return job
+
+    @classmethod
+    def delete_expired(cls):
+        """
+        Deletes the directories of all expired jobs
+        """
+        root = get_export_root()
+        if not os.path.isdir(root):
+            return
+        for job_id in os.listdir(root):
+            if cls.id_re.match(job_id):
+                job = cls(job_id)
+                if job.is_expired():
+                    job.delete()
+
+    def get_last_activity(self):
+        """
+        Returns the time (as a timestamp) that the job last made progress.
+        Status updates and completed chunks are written to the job's
+        directory, so this is its modification time.
+        """
+        try:
+            return os.path.getmtime(self.path)
+        except OSError:
+            return None
+
+    def is_expired(self):
+        last_activity = self.get_last_activity()
+        return last_activity is not None and (
+            time.time() - last_activity > get_export_job_expiry())
+
+    def delete(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def load_status(self):
+        with open(os.path.join(self.path, 'status.json')) as f:
+            return json.load(f)
+
+    def save_status(self, **kwargs):
+        status_path = os.path.join(self.path, 'status.json')
+        status = {}
+        if os.path.exists(status_path):
+            status = self.load_status()
+        status.update(kwargs)
+        # Write to a temporary file first, so that readers never see a
+        # partially written status
+        tmp_path = status_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(status, f)
+        os.rename(tmp_path, status_path)
+
+    def load_spec(self):
+        with open(os.path.join(self.path, 'job.pickle'), 'rb') as f:
+            signature, data = f.read().split(b'\n', 1)
+        if not constant_time_compare(signature, sign_spec(data)):
+            raise ValueError('The export job has an invalid signature.')
+        return pickle.loads(data)
+
+    def get_queryset(self, spec):
+        model = apps.get_model(spec['model'])
+        queryset = model._default_manager.all()
+        queryset.query = spec['query']
+        return queryset
+
+    def get_chunk_path(self, index):
+        return os.path.join(self.path, 'chunk-%06d.done' % index)
+
+    def get_output_path(self):
+        return os.path.join(self.path, self.load_status()['filename'])
+
+    def prepare(self):
+        """
+        Splits the results into chunks, returning a list of
+        `(job_id, index, cursor)` tasks to be passed to `render_export_chunk`
+        """
+        spec = self.load_spec()
+        queryset = self.get_queryset(spec)
+        if KeysetPaginator.supports_queryset(queryset):
+            paginator = KeysetPaginator(queryset, spec['chunk_size'])
+            cursors = [None] + list(paginator.chunk_cursors())
+        else:
+            # The ordering doesn't allow the results to be split
+            cursors = [False]
+        self.save_status(status=JOB_RUNNING, chunks=len(cursors))
+        return [(self.id, i, cursor) for i, cursor in enumerate(cursors)]
+
+    def render_chunk(self, index, cursor):
+        spec = self.load_spec()
+        model_admin = import_string(spec['model_admin'])()
+        queryset = self.get_queryset(spec)
+        if cursor is False:
+            objects = queryset.iterator()
+        else:
+            paginator = KeysetPaginator(queryset, spec['chunk_size'])
+            objects = paginator.page(cursor).object_list
+        renderer = ExportRenderer(model_admin, spec['fields'], spec['format'])
+        tmp_path = self.get_chunk_path(index) + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            for line in renderer.iter_lines(objects, header=index == 0):
+                f.write(force_bytes(line))
+        os.rename(tmp_path, self.get_chunk_path(index))
+
+    def assemble(self):
+        chunks = self.load_status()['chunks']
+        with open(self.get_output_path(), 'wb') as output:
+            for index in range(chunks):
+                chunk_path = self.get_chunk_path(index)
+                with open(chunk_path, 'rb') as chunk:
+                    shutil.copyfileobj(chunk, output)
+                os.remove(chunk_path)
+        self.save_status(status=JOB_COMPLETE)
+
+    def fail(self, message):
+        self.save_status(status=JOB_FAILED, error=message)
+
+    def get_progress(self):
+        """
+        Returns the job's status, with the number of completed chunks added.
+        Pending and running jobs that have stopped making progress are marked
+        as failed.
+        """
+        status = self.load_status()
+        last_activity = self.get_last_activity() or time.time()
+        if status['status'] in (JOB_PENDING, JOB_RUNNING) and (
+            time.time() - last_activity > get_export_job_timeout()
+        ):
+            self.fail('The export stopped unexpectedly.')
+            status = self.load_status()
+        if status['status'] == JOB_COMPLETE:
+            status['completed_chunks'] = status['chunks']
+        else:
+            status['completed_chunks'] = len([
+                name for name in os.listdir(self.path)
+                if name.endswith('.done')])
+        return status
+
+
+def render_export_chunk(task):
+    job_id, index, cursor = task
+    ExportJob(job_id).render_chunk(index, cursor)
+
+
+class ExportJobRunner(object):
+    """
+    The default runner for export jobs. Each job is run in a background
+    thread in the current process, which renders the job's chunks one at a
+    time, before assembling them.
+
+    To run jobs elsewhere (e.g. using a task queue), override `submit()` to
+    pass the job's id to your worker, and call `run()` with it from there.
+    To render chunks in parallel, use `ProcessPoolExportJobRunner`.
+    """
+
+    def submit(self, job):
+        thread = threading.Thread(target=self.run, args=(job.id,))
+        thread.daemon = True
+        thread.start()
+
+    def run(self, job_id):
+        job = ExportJob(job_id)
+        try:
+            tasks = job.prepare()
+            self.render_chunks(job, tasks)
+            job.assemble()
+        except Exception as e:
+            job.fail(force_text(e))
+        finally:
+            connections.close_all()
+
+    def render_chunks(self, job, tasks):
+        for task in tasks:
+            render_export_chunk(task)
+
+
+class ProcessPoolExportJobRunner(ExportJobRunner):
+    """
+    Renders the chunks of each job in parallel, using a pool of `processes`
+    worker processes. The workers are started with the 'spawn' method (so
+    this requires Python 3.4 or later), as forking a web server process that
+    may be running other threads isn't safe.
+    """
+    processes = 2
+
+    def render_chunks(self, job, tasks):
+        if not hasattr(multiprocessing, 'get_context'):
+            raise ImproperlyConfigured(
+                u"%s requires Python 3.4 or later." %
+                self.__class__.__name__)
+        context = multiprocessing.get_context('spawn')
+        pool = context.Pool(self.processes, initializer=init_worker)
+        try:
+            for _ in pool.imap_unordered(render_export_chunk, tasks):
+                pass
+            pool.close()
+        except Exception:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
@@ -0,0 +1,161 @@
+import operator
+from functools import reduce
+
+from django.contrib.admin import FieldListFilter, RelatedFieldListFilter
+from django.contrib.admin.utils import get_model_from_relation
+from django.core.exceptions import ImproperlyConfigured
+from django.core.urlresolvers import reverse
+from django.db.models import Count, Q
+from django.utils.encoding import force_text
+from django.utils.http import urlencode
+
+from .helpers import get_url_name
+
+
+def get_related_field_name(field, other_model):
+    """
+    Returns the name of the field on `other_model` that `field` points to
+    """
+    target_field = getattr(field, 'target_field', None)
+    if target_field is not None:
+        return target_field.name
+    rel = getattr(field, 'rel', None)
+    if rel is not None and hasattr(rel, 'get_related_field'):
+        return rel.get_related_field().name
+    return other_model._meta.pk.name
+
+
+class HighCardinalityRelatedFieldListFilter(RelatedFieldListFilter):
+    """
+    A list filter for relationships to models with a large number of rows
+    (e.g. users or sites). Unlike `RelatedFieldListFilter`, which lists every
+    object in the related table, only the `top_n` most frequently used
+    values are listed. Other values can be found by searching, which uses
+    IndexView's `filter_autocomplete` JSON endpoint.
+
+    Use in `list_filter` on your ModelAdmin class like so:
+    `list_filter = (('author', HighCardinalityRelatedFieldListFilter),)`
+
+    The fields searched on the related model can be controlled by
+    subclassing and setting `search_fields`. Only objects used by the
+    model_admin's `get_index_queryset()` are listed, or found by searching.
+    """
+    template = 'wagtailmodeladmin/includes/filter_autocomplete.html'
+    top_n = 10
+    search_fields = None
+    default_search_fields = (
+        'title', 'name', 'username', 'first_name', 'last_name')
+    autocomplete_limit = 20
+
+    def __init__(self, field, request, params, model, model_admin,
+                 field_path):
+        other_model = get_model_from_relation(field)
+        self.model = model
+        self.model_admin = model_admin
+        self.field_path = field_path
+        self.other_model = other_model
+        self.rel_name = get_related_field_name(field, other_model)
+        self.lookup_kwarg = '%s__%s__exact' % (field_path, self.rel_name)
+        self.lookup_kwarg_isnull = '%s__isnull' % field_path
+        self.lookup_val = request.GET.get(self.lookup_kwarg)
+        self.lookup_val_isnull = request.GET.get(self.lookup_kwarg_isnull)
+        self.lookup_choices = self.field_choices(field, request, model_admin)
+        FieldListFilter.__init__(
+            self, field, request, params, model, model_admin, field_path)
+        if hasattr(field, 'verbose_name'):
+            self.lookup_title = field.verbose_name
+        else:
+            self.lookup_title = other_model._meta.verbose_name
+        self.title = self.lookup_title
+        self.empty_value_display = model_admin.get_empty_value_display()
+        self.base_query_string = '?'
+
+    def field_choices(self, field, request, model_admin):
+        """
+        Returns `(value, label)` tuples for the `top_n` most used values, plus
+        the currently selected value (if there is one). Only those objects are
+        fetched from the related table. Usage is counted over the listing's
+        base queryset, so values only used by objects the user can't see
+        aren't listed.
+        """
+        related_path = '%s__%s' % (self.field_path, self.rel_name)
+        queryset = model_admin.get_index_queryset(request)
+        top_values = queryset.exclude(**{
+            self.lookup_kwarg_isnull: True,
+        }).values_list(related_path).annotate(
+            usage_count=Count('pk')).order_by('-usage_count')[:self.top_n]
+        values = [row[0] for row in top_values]
+        if self.lookup_val and self.lookup_val not in [
+            force_text(v) for v in values
+        ]:
+            values.append(self.lookup_val)
+
+        try:
+            objects = self.other_model._default_manager.filter(**{
+                '%s__in' % self.rel_name: values,
+            })
+            labels = {
+                force_text(getattr(obj, self.rel_name)): force_text(obj)
+                for obj in objects
+            }
+        except (ValueError, TypeError):
+            # The selected value isn't valid for the related field
+            return []
+        return [
+            (value, labels[force_text(value)]) for value in values
+            if force_text(value) in labels
+        ]
+
+    def has_output(self):
+        return True
+
+    def choices(self, cl):
+        self.base_query_string = cl.get_query_string(
+            {}, [self.lookup_kwarg, self.lookup_kwarg_isnull])
+        return super(HighCardinalityRelatedFieldListFilter, self).choices(cl)
+
+    def get_autocomplete_url(self):
+        url = reverse(
+            get_url_name(self.model_admin.opts, 'filter_autocomplete'))
+        return '%s?%s' % (url, urlencode({'field': self.field_path}))
+
+    @classmethod
+    def get_search_fields(cls, other_model):
+        if cls.search_fields:
+            return cls.search_fields
+        field_names = [f.name for f in other_model._meta.get_fields()]
+        search_fields = [
+            f for f in cls.default_search_fields if f in field_names]
+        if not search_fields:
+            raise ImproperlyConfigured(
+                u"The `search_fields` attribute must be set on your `%s` "
+                "class to search %s objects." % (
+                    cls.__name__, other_model._meta.verbose_name))
+        return search_fields
+
+    @classmethod
+    def get_autocomplete_results(cls, field, term, queryset, field_path):
+        """
+        Returns a list of `value`/`label` dictionaries for objects from the
+        related model that match the search `term`. Only objects used by the
+        objects in `queryset` (the listing's base queryset) are included, so
+        that the endpoint can't be used to browse the whole related table.
+        """
+        other_model = get_model_from_relation(field)
+        rel_name = get_related_field_name(field, other_model)
+        search_fields = cls.get_search_fields(other_model)
+        used_values = queryset.order_by().values(
+            '%s__%s' % (field_path, rel_name))
+        qs = other_model._default_manager.filter(**{
+            '%s__in' % rel_name: used_values,
+        })
+        for bit in term.split():
+            qs = qs.filter(reduce(operator.or_, [
+                Q(**{'%s__icontains' % search_field: bit})
+                for search_field in search_fields
+            ]))
+        return [
+            {'value': force_text(getattr(obj, rel_name)),
+             'label': force_text(obj)}
+            for obj in qs[:cls.autocomplete_limit]
+        ]
@@ -1,15 +1,74 @@
 from django import forms
+from django.forms.models import ModelChoiceIterator
 from django.utils.translation import ugettext as _
 from wagtail.wagtailcore.models import Page
 from django.utils.safestring import mark_safe
 
 
+def get_ancestor_titles(pages):
+    """
+    Returns a dictionary mapping the treebeard path of every ancestor of the
+    supplied pages (and the pages themselves) to that page's title, fetched
+    with a single query. The root page (at depth 1) is not included.
+    """
+    steplen = Page.steplen
+    paths = set()
+    for page in pages:
+        for depth in range(2, page.depth + 1):
+            paths.add(page.path[:depth * steplen])
+    if not paths:
+        return {}
+    return dict(
+        Page.objects.filter(path__in=paths).values_list('path', 'title'))
+
+
+class ParentPageChoiceIterator(ModelChoiceIterator):
+    """
+    Evaluates the queryset up front, so that the titles of every page's
+    ancestors can be fetched together before any labels are generated. The
+    field's `choices_queryset` is used in place of its `queryset` if set.
+    """
+
+    def __init__(self, field):
+        super(ParentPageChoiceIterator, self).__init__(field)
+        if field.choices_queryset is not None:
+            self.queryset = field.choices_queryset
+
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ("", self.field.empty_label)
+        pages = list(self.queryset.all())
+        self.field.ancestor_titles = get_ancestor_titles(pages)
+        for obj in pages:
+            yield self.choice(obj)
+
+
 class CustomModelChoiceField(forms.ModelChoiceField):
+    ancestor_titles = None
+    choices_queryset = None
+
+    def _get_choices(self):
+        if hasattr(self, '_choices'):
+            return self._choices
+        return ParentPageChoiceIterator(self)
+
+    choices = property(_get_choices, forms.ChoiceField._set_choices)
+
     def label_from_instance(self, obj):
         bits = []
-        for ancestor in obj.get_ancestors(inclusive=True).exclude(depth=1):
-            bits.append(ancestor.title)
-        return mark_safe('<span class="icon icon-arrow-right"></span>'.join(bits))
+        if self.ancestor_titles is not None:
+            steplen = Page.steplen
+            for depth in range(2, obj.depth + 1):
+                path = obj.path[:depth * steplen]
+                if path in self.ancestor_titles:
+                    bits.append(self.ancestor_titles[path])
+        else:
+            for ancestor in obj.get_ancestors(inclusive=True).exclude(
+                depth=1
+            ):
+                bits.append(ancestor.title)
+        return mark_safe(
+            '<span class="icon icon-arrow-right"></span>'.join(bits))
 
 
 class ParentChooserForm(forms.Form):
@@ -22,6 +81,17 @@ class ParentChooserForm(forms.Form):
     )
 
     def __init__(self, valid_parents_qs, *args, **kwargs):
+        """
+        If `choices_qs` is supplied, only those pages are rendered as choices
+        (e.g. a single page of search results). The submitted value is still
+        validated against `valid_parents_qs`, with a single query for that
+        page, so the full set of valid parents never needs to be loaded.
+        """
+        choices_qs = kwargs.pop('choices_qs', None)
         self.valid_parents_qs = valid_parents_qs
         super(ParentChooserForm, self).__init__(*args, **kwargs)
-        self.fields['parent_page'].queryset = self.valid_parents_qs
+        field = self.fields['parent_page']
+        # Setting `queryset` creates the widget's choice iterator, which
+        # picks up `choices_queryset`, so that must be set first
+        field.choices_queryset = choices_qs
+        field.queryset = self.valid_parents_qs
@@ -1,11 +1,21 @@
+import hashlib
+import operator
 import urllib
+from functools import reduce
+
 from django.contrib.auth import get_permission_codename
 from django.contrib.auth.models import Permission
 from django.utils.translation import ugettext as _
-from django.utils.encoding import force_text
+from django.utils.encoding import force_bytes, force_text
+from django.utils.functional import cached_property
+from django.utils.http import urlquote
 from django.contrib.admin.utils import quote
 from django.core.urlresolvers import reverse
-from wagtail.wagtailcore.models import Page
+from django.db.models import Q
+from wagtail.wagtailcore.models import (
+    GroupPagePermission, Page, UserPagePermissionsProxy)
+
+from .permissions import get_model_permission_codenames
 
 
 class PermissionHelper(object):
@@ -19,12 +29,27 @@ class PermissionHelper(object):
         self.model = model
         self.opts = model._meta
 
+    def get_request_cache(self, user):
+        """
+        Returns a dictionary for memoising values for `user` and this model.
+        It is stored on the user object (in the same way as Django's auth
+        backends cache permissions), so lasts for the current request only.
+        """
+        try:
+            caches = user._wagtailmodeladmin_cache
+        except AttributeError:
+            caches = user._wagtailmodeladmin_cache = {}
+        return caches.setdefault(self.opts.label_lower, {})
+
     def get_all_model_permissions(self):
         return Permission.objects.filter(
             content_type__app_label=self.opts.app_label,
             content_type__model=self.opts.model_name,
         )
 
+    def get_all_model_permission_codenames(self):
+        return get_model_permission_codenames(self.model)
+
     def has_specific_permission(self, user, codename):
         return user.has_perm("%s.%s" % (self.opts.app_label, codename))
 
@@ -33,8 +58,8 @@ class PermissionHelper(object):
         Return a boolean to indicate whether the supplied user has any
         permissions at all on the associated model
         """
-        for perm in self.get_all_model_permissions():
-            if self.has_specific_permission(user, perm.codename):
+        for codename in self.get_all_model_permission_codenames():
+            if self.has_specific_permission(user, codename):
                 return True
         return False
 
@@ -95,6 +120,35 @@ class PermissionHelper(object):
         """
         return False
 
+    def prefetch_object_permissions(self, user, objects):
+        """
+        Called with each page of results in the listing view, before buttons
+        are generated for them, to allow anything needed to check permissions
+        on the individual objects to be fetched in bulk. Typical models only
+        have model-wide permissions, so there's nothing to do.
+        """
+        pass
+
+    def get_permission_fingerprint(self, user):
+        """
+        Returns a string that is the same for any two users who would be
+        permitted to do the same things with every object of this model (e.g.
+        for use in cache keys for content that varies by permission)
+        """
+        cache = self.get_request_cache(user)
+        if 'fingerprint' not in cache:
+            cache['fingerprint'] = hashlib.md5(force_bytes(
+                repr(self.get_permission_fingerprint_data(user)))).hexdigest()
+        return cache['fingerprint']
+
+    def get_permission_fingerprint_data(self, user):
+        prefix = '%s.' % self.opts.app_label
+        return [
+            user.is_active, user.is_superuser,
+            sorted(p for p in user.get_all_permissions()
+                   if p.startswith(prefix)),
+        ]
+
 
 class PagePermissionHelper(PermissionHelper):
     """
@@ -105,26 +159,66 @@ class PagePermissionHelper(PermissionHelper):
     object-specific basis.
     """
 
+    def get_permission_fingerprint_data(self, user):
+        """
+        Permissions on pages come from the pages that the user's groups have
+        been given permissions on. 'add' permissions also allow users to edit
+        pages they own, in which case the user themselves must be included.
+        """
+        data = super(
+            PagePermissionHelper, self).get_permission_fingerprint_data(user)
+        page_perms = sorted(GroupPagePermission.objects.filter(
+            group__user=user).values_list('permission_type', 'page__path'))
+        data.append(page_perms)
+        if any(permission_type == 'add' for permission_type, p in page_perms):
+            data.append(user.pk)
+        return data
+
+    def get_add_permission_roots(self, user):
+        """
+        Returns the paths of the pages that `user`'s groups have been given
+        'add' permission on. Subpages can be added anywhere beneath these.
+        """
+        cache = self.get_request_cache(user)
+        if 'add_roots' not in cache:
+            cache['add_roots'] = list(GroupPagePermission.objects.filter(
+                group__user=user, permission_type='add',
+            ).values_list('page__path', flat=True).distinct())
+        return cache['add_roots']
+
     def get_valid_parent_pages(self, user):
         """
         Identifies possible parent pages for the current user by first looking
         at allowed_parent_page_models() on self.model to limit options to the
-        correct type of page, then checking permissions on those individual
-        pages to make sure we have permission to add a subpage to it.
+        correct type of page, then limiting those to the subtrees of the pages
+        the user has 'add' permission on (matched by treebeard path prefix),
+        so that everything is worked out in a single query. The queryset is
+        memoised for the rest of the request.
         """
-        # Start with empty qs
-        parents_qs = Page.objects.none()
-
-        # Add pages of the correct type
-        for pt in self.model.allowed_parent_page_models():
-            pt_items = Page.objects.type(pt)
-            parents_qs = parents_qs | pt_items
-
-        # Exclude pages that we can't add subpages to
-        for page in parents_qs.all():
-            if not page.permissions_for_user(user).can_add_subpage():
-                parents_qs = parents_qs.exclude(pk=page.pk)
+        cache = self.get_request_cache(user)
+        if 'valid_parents' in cache:
+            return cache['valid_parents']
 
+        parents_qs = Page.objects.none()
+        allowed_parent_models = self.model.allowed_parent_page_models()
+        if user.is_active and allowed_parent_models:
+            # Pages of the correct type
+            type_q = reduce(operator.or_, [
+                Page.objects.all().type_q(pt) for pt in allowed_parent_models
+            ])
+            parents_qs = Page.objects.filter(type_q)
+
+            # That we can add subpages to
+            if not user.is_superuser:
+                roots = self.get_add_permission_roots(user)
+                if roots:
+                    parents_qs = parents_qs.filter(reduce(operator.or_, [
+                        Q(path__startswith=path) for path in roots
+                    ]))
+                else:
+                    parents_qs = Page.objects.none()
+
+        cache['valid_parents'] = parents_qs
         return parents_qs
 
     def has_list_permssion(self, user):
@@ -137,29 +231,104 @@ class PagePermissionHelper(PermissionHelper):
         """
         return True
 
+    def get_editable_pages_filter(self, user):
+        """
+        Returns a `Q` object matching the pages `user` can edit, or `None` if
+        they can edit every page. Pages are matched by treebeard path prefix,
+        using the paths of the pages the user's groups have been given 'edit'
+        permission on (or 'add' permission, for pages the user owns), so
+        that listings can be restricted in SQL.
+        """
+        if not user.is_active:
+            return Q(pk__in=[])
+        if user.is_superuser:
+            return None
+        editable = Q(pk__in=[])
+        perms = GroupPagePermission.objects.filter(
+            group__user=user, permission_type__in=('add', 'edit'),
+        ).values_list('permission_type', 'page__path')
+        for permission_type, path in perms:
+            if permission_type == 'edit':
+                editable |= Q(path__startswith=path)
+            else:
+                editable |= Q(path__startswith=path, owner=user)
+        return editable
+
     def has_add_permission(self, user):
         """
         For models extending Page, whether or not a page of this type can be
         added somewhere in the tree essentially determines the add permission,
         rather than actual model-wide permissions
         """
-        return self.get_valid_parent_pages(user).count() > 0
+        cache = self.get_request_cache(user)
+        if 'has_add_permission' not in cache:
+            cache['has_add_permission'] = (
+                self.get_valid_parent_pages(user).exists())
+        return cache['has_add_permission']
+
+    def prefetch_object_permissions(self, user, objects):
+        """
+        Prepares permission checks for a page of results in bulk. The user's
+        group page permissions are loaded once (rather than once per
+        `permissions_for_user()` call), and the parents of all pages are
+        fetched with a single query, by their treebeard paths. The results are
+        stored on the pages themselves, and used by `get_page_permissions()`
+        and `get_parent_page()`.
+        """
+        user_perms = UserPagePermissionsProxy(user)
+        steplen = Page.steplen
+        parent_paths = set(
+            obj.path[:-steplen] for obj in objects if obj.depth > 1)
+        parents = {}
+        if parent_paths:
+            for parent in Page.objects.filter(path__in=parent_paths):
+                parent._modeladmin_page_perms = user_perms.for_page(parent)
+                parents[parent.path] = parent
+        for obj in objects:
+            obj._modeladmin_page_perms = user_perms.for_page(obj)
+            obj._modeladmin_parent_page = parents.get(obj.path[:-steplen])
+
+    def get_page_permissions(self, user, obj):
+        """
+        Returns a `PagePermissionTester` for `obj`, using the one prepared by
+        `prefetch_object_permissions()` where available
+        """
+        perms = getattr(obj, '_modeladmin_page_perms', None)
+        if perms is not None and perms.user == user:
+            return perms
+        return obj.permissions_for_user(user)
+
+    def get_parent_page(self, obj):
+        if hasattr(obj, '_modeladmin_parent_page'):
+            return obj._modeladmin_parent_page
+        return obj.get_parent()
 
     def can_edit_object(self, user, obj):
-        perms = obj.permissions_for_user(user)
+        perms = self.get_page_permissions(user, obj)
         return perms.can_edit()
 
     def can_delete_object(self, user, obj):
-        perms = obj.permissions_for_user(user)
+        perms = self.get_page_permissions(user, obj)
         return perms.can_delete()
 
     def can_unpublish_object(self, user, obj):
-        perms = obj.permissions_for_user(user)
+        perms = self.get_page_permissions(user, obj)
         return obj.live and perms.can_unpublish()
 
     def can_copy_object(self, user, obj):
-        parent_page = obj.get_parent()
-        return parent_page.permissions_for_user(user).can_publish_subpage()
+        parent_page = self.get_parent_page(obj)
+        if parent_page is None:
+            return False
+        perms = self.get_page_permissions(user, parent_page)
+        return perms.can_publish_subpage()
+
+
+# Stands in for the pk in URL templates for object-specific actions (it must
+# match the `object_id` pattern below)
+URL_PK_PLACEHOLDER = '__pk__'
+
+# Characters that `reverse()` leaves unquoted in URLs
+URL_SAFE_CHARS = "!$&'()*+,;=/~:@"
 
 
 def get_url_pattern(model_meta, action=None):
@@ -196,17 +365,60 @@ class ButtonHelper(object):
         self.permission_helper = permission_helper
         self.inspect_view_enabled = inspect_view_enabled
         self.model_name = force_text(self.opts.verbose_name).lower()
+        # Buttons for every row of a listing share the same URLs (apart from
+        # the pk), classnames and text, so these are worked out once each
+        self._url_templates = {}
+        self._classnames = {}
+
+    def get_button_text(self):
+        """
+        Returns a dictionary of translated `(label, title)` tuples for the
+        buttons for each action
+        """
+        return {
+            'inspect': (
+                _('Inspect'), _('View details for this %s') % self.model_name),
+            'edit': (_('Edit'), _('Edit this %s') % self.model_name),
+            'confirm_delete': (
+                _('Delete'), _('Delete this %s') % self.model_name),
+        }
+
+    @cached_property
+    def button_text(self):
+        return self.get_button_text()
 
     def finalise_classname(self, classnames_add=[], classnames_exclude=[]):
-        combined = self.default_button_classnames + classnames_add
-        finalised = [cn for cn in combined if cn not in classnames_exclude]
-        return ' '.join(finalised)
+        key = (tuple(classnames_add), tuple(classnames_exclude))
+        if key not in self._classnames:
+            combined = self.default_button_classnames + classnames_add
+            finalised = [
+                cn for cn in combined if cn not in classnames_exclude]
+            self._classnames[key] = ' '.join(finalised)
+        return self._classnames[key]
+
+    def get_action_url_template(self, action):
+        """
+        Returns the URL for `action`, with URL_PK_PLACEHOLDER in place of the
+        object's pk (for object-specific actions)
+        """
+        if action not in self._url_templates:
+            kwargs = {}
+            if action not in ('create', 'index'):
+                kwargs.update({'object_id': URL_PK_PLACEHOLDER})
+            self._url_templates[action] = reverse(
+                get_url_name(self.opts, action), kwargs=kwargs)
+        return self._url_templates[action]
 
     def get_action_url(self, action='index', pk=None):
-        kwargs = {}
-        if pk and action not in ('create', 'index'):
-            kwargs.update({'object_id': pk})
-        return reverse(get_url_name(self.opts, action), kwargs=kwargs)
+        if action in ('create', 'index'):
+            return self.get_action_url_template(action)
+        if pk:
+            # Equivalent to reversing the URL with the pk, without having to
+            # go through the URL resolver for every object
+            url = self.get_action_url_template(action)
+            start, placeholder, end = url.rpartition(URL_PK_PLACEHOLDER)
+            return start + urlquote(pk, safe=URL_SAFE_CHARS) + end
+        return reverse(get_url_name(self.opts, action))
 
     def show_add_button(self):
         return self.permission_helper.has_add_permission(self.user)
@@ -221,35 +433,31 @@ class ButtonHelper(object):
             'title': _('Add a new %s') % self.model_name,
         }
 
-    def inspect_button(self, pk, classnames_add=[], classnames_exclude=[]):
-        classnames = self.inspect_button_classnames + classnames_add
-        cn = self.finalise_classname(classnames, classnames_exclude)
+    def get_button(self, action, pk, classnames, classnames_add=[],
+                   classnames_exclude=[]):
+        label, title = self.button_text[action]
         return {
-            'url': self.get_action_url('inspect', pk),
-            'label': _('Inspect'),
-            'classname': cn,
-            'title': _('View details for this %s') % self.model_name,
+            'url': self.get_action_url(action, pk),
+            'label': label,
+            'classname': self.finalise_classname(
+                classnames + classnames_add, classnames_exclude),
+            'title': title,
         }
 
+    def inspect_button(self, pk, classnames_add=[], classnames_exclude=[]):
+        return self.get_button(
+            'inspect', pk, self.inspect_button_classnames, classnames_add,
+            classnames_exclude)
+
     def edit_button(self, pk, classnames_add=[], classnames_exclude=[]):
-        classnames = self.edit_button_classnames + classnames_add
-        cn = self.finalise_classname(classnames, classnames_exclude)
-        return {
-            'url': self.get_action_url('edit', pk),
-            'label': _('Edit'),
-            'classname': cn,
-            'title': _('Edit this %s') % self.model_name,
-        }
+        return self.get_button(
+            'edit', pk, self.edit_button_classnames, classnames_add,
+            classnames_exclude)
 
     def delete_button(self, pk, classnames_add=[], classnames_exclude=[]):
-        classnames = self.delete_button_classnames + classnames_add
-        cn = self.finalise_classname(classnames, classnames_exclude)
-        return {
-            'url': self.get_action_url('confirm_delete', pk),
-            'label': _('Delete'),
-            'classname': cn,
-            'title': _('Delete this %s') % self.model_name,
-        }
+        return self.get_button(
+            'confirm_delete', pk, self.delete_button_classnames,
+            classnames_add, classnames_exclude)
 
     def get_buttons_for_obj(self, obj, exclude=[], classnames_add=[],
                             classnames_exclude=[]):
@@ -276,25 +484,24 @@ class PageButtonHelper(ButtonHelper):
     unpublish_button_classnames = []
     copy_button_classnames = []
 
+    def get_button_text(self):
+        text = super(PageButtonHelper, self).get_button_text()
+        text.update({
+            'unpublish': (
+                _('Unpublish'), _('Unpublish this %s') % self.model_name),
+            'copy': (_('Copy'), _('Copy this %s') % self.model_name),
+        })
+        return text
+
     def unpublish_button(self, pk, classnames_add=[], classnames_exclude=[]):
-        classnames = self.unpublish_button_classnames + classnames_add
-        cn = self.finalise_classname(classnames, classnames_exclude)
-        return {
-            'url': self.get_action_url('unpublish', pk),
-            'label': _('Unpublish'),
-            'classname': cn,
-            'title': _('Unpublish this %s') % self.model_name,
-        }
+        return self.get_button(
+            'unpublish', pk, self.unpublish_button_classnames,
+            classnames_add, classnames_exclude)
 
     def copy_button(self, pk, classnames_add=[], classnames_exclude=[]):
-        classnames = self.copy_button_classnames + classnames_add
-        cn = self.finalise_classname(classnames, classnames_exclude)
-        return {
-            'url': self.get_action_url('copy', pk),
-            'label': _('Copy'),
-            'classname': cn,
-            'title': _('Copy this %s') % self.model_name,
-        }
+        return self.get_button(
+            'copy', pk, self.copy_button_classnames, classnames_add,
+            classnames_exclude)
 
     def get_buttons_for_obj(self, obj, exclude=[], classnames_add=[],
                             classnames_exclude=[]):
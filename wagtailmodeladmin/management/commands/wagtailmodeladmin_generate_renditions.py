@@ -0,0 +1,83 @@
+import multiprocessing
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from wagtail.wagtailcore import hooks
+
+from wagtailmodeladmin.options import get_registered_modeladmins
+from wagtailmodeladmin.renditions import generate_renditions
+from wagtailmodeladmin.workers import init_worker
+
+
+def generate_chunk(task):
+    image_ids, spec = task
+    try:
+        return generate_renditions(image_ids, spec)
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = (
+        "Generates the image renditions used to display objects for every "
+        "registered ModelAdmin (thumbnails from ThumbmnailMixin, and images "
+        "in inspect views), using a pool of worker processes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', type=int, default=None,
+            help="The number of worker processes to use (defaults to the "
+                 "number of CPUs).")
+        parser.add_argument(
+            '--chunk-size', type=int, default=100,
+            help="The number of images each worker handles at a time.")
+
+    def get_tasks(self, chunk_size):
+        """
+        Returns a list of `(image_ids, spec)` tasks, covering every image
+        used by every registered ModelAdmin, for each filter spec used with
+        it
+        """
+        image_ids = {}
+        for model_admin in get_registered_modeladmins():
+            for field_name, spec in model_admin.get_rendition_specs():
+                qs = model_admin.model._default_manager.filter(**{
+                    '%s__isnull' % field_name: False,
+                }).values_list(field_name, flat=True).distinct()
+                image_ids.setdefault(spec, set()).update(qs)
+
+        tasks = []
+        for spec, ids in sorted(image_ids.items()):
+            ids = sorted(ids)
+            for i in range(0, len(ids), chunk_size):
+                tasks.append((ids[i:i + chunk_size], spec))
+        return tasks
+
+    def handle(self, *args, **options):
+        # Make sure every ModelAdmin has been registered
+        hooks.get_hooks('register_admin_urls')
+
+        tasks = self.get_tasks(options['chunk_size'])
+        if not tasks:
+            self.stdout.write("No renditions to generate.")
+            return
+
+        # Worker processes must not share this process's connections
+        connections.close_all()
+        pool = multiprocessing.Pool(
+            options['processes'], initializer=init_worker)
+        try:
+            count = 0
+            for result in pool.imap_unordered(generate_chunk, tasks):
+                count += result
+            pool.close()
+        except Exception:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+        self.stdout.write(
+            "Checked renditions for %d images in %d chunks." % (
+                count, len(tasks)))
@@ -5,21 +5,48 @@ from django.conf.urls import url
 from django.core.urlresolvers import reverse
 from django.core.exceptions import ImproperlyConfigured
 from django.db.models import Model
+from django.db.models.fields import FieldDoesNotExist
 from django.forms.widgets import flatatt
 from django.utils.translation import ugettext_lazy as _
 from django.utils.safestring import mark_safe
 
 from wagtail.wagtailcore.models import Page
-from wagtail.wagtailimages.models import Filter
 from wagtail.wagtailcore import hooks
+from wagtail.wagtailimages.models import get_image_model
 
+from .counts import COUNT_CACHED, connect_count_invalidation
+from .renditions import (
+    INSPECT_IMAGE_FILTER_SPEC, connect_rendition_warmup, get_rendition,
+    prefetch_renditions)
+from .permissions import connect_permission_cache_invalidation
 from .menus import ModelAdminMenuItem, GroupMenuItem, SubMenu
 from .helpers import (
     PermissionHelper, PagePermissionHelper, ButtonHelper, PageButtonHelper,
     get_url_pattern, get_object_specific_url_pattern, get_url_name)
 from .views import (
     IndexView, InspectView, CreateView, ChooseParentView, EditView,
-    ConfirmDeleteView, CopyRedirectView, UnpublishRedirectView)
+    ConfirmDeleteView, CopyRedirectView, UnpublishRedirectView,
+    IndexFiltersView, IndexAPIView, ExportView, ExportJobView,
+    ExportJobStatusView, FilterAutocompleteView, ChooseParentSearchView)
+from .exports import ExportJobRunner
+
+
+# Every ModelAdmin and ModelAdminGroup instance registered with Wagtail
+registry = []
+
+
+def get_registered_modeladmins():
+    """
+    Returns a list of every registered ModelAdmin instance, including those
+    within registered ModelAdminGroups
+    """
+    modeladmins = []
+    for instance in registry:
+        if isinstance(instance, ModelAdminGroup):
+            modeladmins.extend(instance.modeladmin_instances)
+        else:
+            modeladmins.append(instance)
+    return modeladmins
 
 
 class WagtailRegisterable(object):
@@ -30,6 +57,7 @@ class WagtailRegisterable(object):
     add_to_settings_menu = False
 
     def register_with_wagtail(self):
+        registry.append(self)
 
         @hooks.register('register_permissions')
         def register_permissions():
@@ -77,15 +105,37 @@ class ThumbmnailMixin(object):
             'class': self.thumb_classname,
         }
         if image:
-            fltr, _ = Filter.objects.get_or_create(
-                spec=self.thumb_image_filter_spec)
-            img_attrs.update({'src': image.get_rendition(fltr).url})
+            rendition = get_rendition(image, self.thumb_image_filter_spec)
+            img_attrs.update({'src': rendition.url})
             return mark_safe('<img{}>'.format(flatatt(img_attrs)))
         elif self.thumb_default:
             return mark_safe('<img{}>'.format(flatatt(img_attrs)))
         return ''
     admin_thumb.short_description = thumb_col_header_text
 
+    def get_extra_select_related(self, request):
+        fields = super(ThumbmnailMixin, self).get_extra_select_related(request)
+        if 'admin_thumb' in self.get_list_display(request):
+            fields = list(fields) + [self.thumb_image_field_name]
+        return fields
+
+    def get_rendition_specs(self):
+        specs = super(ThumbmnailMixin, self).get_rendition_specs()
+        return list(specs) + [
+            (self.thumb_image_field_name, self.thumb_image_filter_spec)]
+
+    def prefetch_for_list_display(self, request, objects):
+        """
+        Finds the thumbnail renditions for every object in one go
+        """
+        super(ThumbmnailMixin, self).prefetch_for_list_display(
+            request, objects)
+        if 'admin_thumb' in self.get_list_display(request):
+            prefetch_renditions(
+                [getattr(obj, self.thumb_image_field_name, None)
+                 for obj in objects],
+                self.thumb_image_filter_spec)
+
 
 class ModelAdmin(WagtailRegisterable):
     """
@@ -105,27 +155,56 @@ class ModelAdmin(WagtailRegisterable):
     inspect_view_fields = None
     inspect_view_fields_exclude = []
     inspect_view_enabled = False
+    index_api_enabled = False
+    export_formats = ()
+    export_fields = None
+    export_chunk_size = 1000
+    export_in_background = False
+    export_job_runner_class = ExportJobRunner
     empty_value_display = '-'
     list_filter = ()
+    list_filter_counts = False
+    list_filter_lazy = False
     list_select_related = False
+    list_editable_pages_only = False
+    list_row_cache_version_field = None
+    list_row_cache_timeout = 300
+    last_modified_field = None
+    warm_renditions_on_save = False
     list_per_page = 100
+    choose_parent_per_page = 50
+    pagination_mode = 'offset'
+    count_strategy = 'exact'
+    count_cache_timeout = 300
+    count_cap = 1000
+    count_estimate_threshold = 10000
     search_fields = None
+    search_backend = None
+    search_backend_results_limit = 1000
     ordering = None
     parent = None
     index_view_class = IndexView
+    filters_view_class = IndexFiltersView
+    api_view_class = IndexAPIView
+    export_view_class = ExportView
+    export_job_view_class = ExportJobView
+    export_status_view_class = ExportJobStatusView
     create_view_class = CreateView
     inspect_view_class = InspectView
     edit_view_class = EditView
     confirm_delete_view_class = ConfirmDeleteView
     choose_parent_view_class = ChooseParentView
+    choose_parent_search_view_class = ChooseParentSearchView
     copy_view_class = CopyRedirectView
     unpublish_view_class = UnpublishRedirectView
+    filter_autocomplete_view_class = FilterAutocompleteView
     index_template_name = ''
     create_template_name = ''
     edit_template_name = ''
     inspect_template_name = ''
     confirm_delete_template_name = ''
     choose_parent_template_name = ''
+    export_job_template_name = ''
     permission_helper_class = None
     button_helper_class = None
     index_view_extra_css = []
@@ -148,6 +227,14 @@ class ModelAdmin(WagtailRegisterable):
         self.parent = parent
         permission_helper_class = self.get_permission_helper_class()
         self.permission_helper = permission_helper_class(self.model)
+        connect_permission_cache_invalidation()
+        if (
+            self.count_strategy == COUNT_CACHED or self.list_filter_counts or
+            self.last_modified_field
+        ):
+            connect_count_invalidation(self.model)
+        if self.warm_renditions_on_save:
+            connect_rendition_warmup(self)
 
     def get_permission_helper_class(self):
         if self.permission_helper_class:
@@ -213,6 +300,20 @@ class ModelAdmin(WagtailRegisterable):
         """
         return self.list_display_add_buttons or self.list_display[0]
 
+    def get_export_fields(self, request):
+        """
+        Return a sequence containing the fields/method output to be included
+        in exports of the list view. Defaults to `list_display`.
+        """
+        return self.export_fields or self.get_list_display(request)
+
+    def get_export_job_runner(self):
+        """
+        Return an object with a `submit()` method, which is passed each
+        `ExportJob` created when 'export_in_background' is True.
+        """
+        return self.export_job_runner_class()
+
     def get_empty_value_display(self):
         """
         Return the empty_value_display set on ModelAdmin.
@@ -244,6 +345,20 @@ class ModelAdmin(WagtailRegisterable):
             qs = qs.order_by(*ordering)
         return qs
 
+    def get_index_queryset(self, request):
+        """
+        Returns the QuerySet that the index view lists, and that its filters
+        choose their values from. This is `get_queryset()`, limited to the
+        pages the user can edit when `list_editable_pages_only` is True.
+        """
+        qs = self.get_queryset(request)
+        if self.is_pagemodel and self.list_editable_pages_only:
+            editable = self.permission_helper.get_editable_pages_filter(
+                request.user)
+            if editable is not None:
+                qs = qs.filter(editable)
+        return qs
+
     def get_search_fields(self, request):
         """
         Returns a sequence defining which fields on a model should be searched
@@ -283,6 +398,44 @@ class ModelAdmin(WagtailRegisterable):
         """
         return []
 
+    def get_rendition_specs(self):
+        """
+        Return a list of `(field_name, filter_spec)` tuples for the image
+        renditions used to display this model's objects, which are
+        pre-generated by the 'wagtailmodeladmin_generate_renditions' command,
+        and when objects are saved if 'warm_renditions_on_save' is True.
+        """
+        specs = []
+        if self.inspect_view_enabled:
+            image_model = get_image_model()
+            for field_name in self.get_inspect_view_fields():
+                try:
+                    field = self.opts.get_field(field_name)
+                except FieldDoesNotExist:
+                    continue
+                if (
+                    field.get_internal_type() == 'ForeignKey' and
+                    field.related_model == image_model
+                ):
+                    specs.append((field_name, INSPECT_IMAGE_FILTER_SPEC))
+        return specs
+
+    def get_extra_select_related(self, request):
+        """
+        Return a sequence of related fields that should always be fetched
+        with the list view's results using `select_related()`, in addition
+        to any specified by `list_select_related` (unless that is True).
+        """
+        return []
+
+    def prefetch_for_list_display(self, request, objects):
+        """
+        Called with each page of objects in the list view before they are
+        rendered, allowing anything needed to render them to be fetched for
+        all of them at once.
+        """
+        pass
+
     def get_extra_attrs_for_field_col(self, obj, field_name):
         """
         Return a dictionary of additional HTML attributes to be added to a
@@ -299,7 +452,9 @@ class ModelAdmin(WagtailRegisterable):
         return css
 
     def get_index_view_extra_js(self):
-        return self.index_view_extra_js
+        js = ['wagtailmodeladmin/js/index.js']
+        js.extend(self.index_view_extra_js)
+        return js
 
     def get_form_view_extra_css(self):
         return self.form_view_extra_css
@@ -351,6 +506,18 @@ class ModelAdmin(WagtailRegisterable):
         view_class = self.choose_parent_view_class
         return view_class.as_view(**kwargs)(request)
 
+    def choose_parent_search_view(self, request):
+        """
+        Instantiates a class-based view that returns a page of possible parent
+        pages for new objects as JSON, filtered by a search term, where the
+        assigned model extends Wagtail's Page model. The view class used can
+        be overridden by changing the 'choose_parent_search_view_class'
+        attribute.
+        """
+        kwargs = {'model_admin': self}
+        view_class = self.choose_parent_search_view_class
+        return view_class.as_view(**kwargs)(request)
+
     def edit_view(self, request, object_id):
         """
         Instantiates a class-based view to provide 'edit' functionality for the
@@ -400,6 +567,71 @@ class ModelAdmin(WagtailRegisterable):
         view_class = self.copy_view_class
         return view_class.as_view(**kwargs)(request)
 
+    def filters_view(self, request):
+        """
+        Instantiates a class-based view that renders just the filter sidebar
+        for the listing view, which is loaded after the rest of the page when
+        'list_filter_lazy' is True. The view class used can be overridden by
+        changing the 'filters_view_class' attribute.
+        """
+        kwargs = {'model_admin': self}
+        view_class = self.filters_view_class
+        return view_class.as_view(**kwargs)(request)
+
+    def api_view(self, request):
+        """
+        Instantiates a class-based view that returns the results of the
+        listing view as JSON, when 'index_api_enabled' is True. The view class
+        used can be overridden by changing the 'api_view_class' attribute.
+        """
+        kwargs = {'model_admin': self}
+        view_class = self.api_view_class
+        return view_class.as_view(**kwargs)(request)
+
+    def export_view(self, request):
+        """
+        Instantiates a class-based view that streams the results of the
+        listing view in one of the formats in 'export_formats' ('csv' or
+        'jsonl'). The view class used can be overridden by changing the
+        'export_view_class' attribute.
+        """
+        kwargs = {'model_admin': self}
+        view_class = self.export_view_class
+        return view_class.as_view(**kwargs)(request)
+
+    def export_job_view(self, request):
+        """
+        Instantiates a class-based view that starts a background export of the
+        results of the listing view, when 'export_in_background' is True. The
+        view class used can be overridden by changing the
+        'export_job_view_class' attribute.
+        """
+        kwargs = {'model_admin': self}
+        view_class = self.export_job_view_class
+        return view_class.as_view(**kwargs)(request)
+
+    def export_status_view(self, request):
+        """
+        Instantiates a class-based view that reports the progress of a
+        background export, and serves the file once it is complete. The view
+        class used can be overridden by changing the
+        'export_status_view_class' attribute.
+        """
+        kwargs = {'model_admin': self}
+        view_class = self.export_status_view_class
+        return view_class.as_view(**kwargs)(request)
+
+    def filter_autocomplete_view(self, request):
+        """
+        Instantiates a class-based view that returns JSON search results for
+        list filters that support searching for values, such as
+        `HighCardinalityRelatedFieldListFilter`. The view class used can be
+        overridden by changing the 'filter_autocomplete_view_class' attribute.
+        """
+        kwargs = {'model_admin': self}
+        view_class = self.filter_autocomplete_view_class
+        return view_class.as_view(**kwargs)(request)
+
     def get_templates(self, action='index'):
         """
         Utility function that provides a list of templates to try for a given
@@ -470,6 +702,16 @@ class ModelAdmin(WagtailRegisterable):
         return self.confirm_delete_template_name or self.get_templates(
             'confirm_delete')
 
+    def get_export_job_template(self):
+        """
+        Returns a template to be used when rendering 'export_status_view'. If
+        a template is specified by the 'export_job_template_name' attribute,
+        that will be used. Otherwise, a list of preferred template names are
+        returned.
+        """
+        return self.export_job_template_name or self.get_templates(
+            'export_job')
+
     def get_menu_item(self, order=None):
         """
         Utilised by Wagtail's 'register_menu_item' hook to create a menu item
@@ -504,7 +746,28 @@ class ModelAdmin(WagtailRegisterable):
             url(get_object_specific_url_pattern(self.opts, 'confirm_delete'),
                 self.confirm_delete_view,
                 name=get_url_name(self.opts, 'confirm_delete')),
+            url(get_url_pattern(self.opts, 'filters'),
+                self.filters_view, name=get_url_name(self.opts, 'filters')),
+            url(get_url_pattern(self.opts, 'filter_autocomplete'),
+                self.filter_autocomplete_view,
+                name=get_url_name(self.opts, 'filter_autocomplete')),
         )
+        if self.index_api_enabled:
+            urls = urls + (
+                url(get_url_pattern(self.opts, 'api'),
+                    self.api_view, name=get_url_name(self.opts, 'api')),
+            )
+        if self.export_formats:
+            urls = urls + (
+                url(get_url_pattern(self.opts, 'export'),
+                    self.export_view, name=get_url_name(self.opts, 'export')),
+                url(get_url_pattern(self.opts, 'export_job'),
+                    self.export_job_view,
+                    name=get_url_name(self.opts, 'export_job')),
+                url(get_url_pattern(self.opts, 'export_status'),
+                    self.export_status_view,
+                    name=get_url_name(self.opts, 'export_status')),
+            )
         if self.inspect_view_enabled:
             urls = urls + (
                 url(get_object_specific_url_pattern(self.opts, 'inspect'),
@@ -516,6 +779,9 @@ class ModelAdmin(WagtailRegisterable):
                 url(get_url_pattern(self.opts, 'choose_parent'),
                     self.choose_parent_view,
                     name=get_url_name(self.opts, 'choose_parent')),
+                url(get_url_pattern(self.opts, 'choose_parent_search'),
+                    self.choose_parent_search_view,
+                    name=get_url_name(self.opts, 'choose_parent_search')),
                 url(get_object_specific_url_pattern(self.opts, 'unpublish'),
                     self.unpublish_view,
                     name=get_url_name(self.opts, 'unpublish')),
@@ -0,0 +1,407 @@
+import base64
+import datetime
+import decimal
+import json
+import uuid
+
+from django.core.paginator import (
+    EmptyPage, Page, PageNotAnInteger, Paginator)
+from django.db import connections
+from django.db.models import Q
+from django.db.models.constants import LOOKUP_SEP
+from django.db.models.fields import FieldDoesNotExist
+from django.utils import six
+from django.utils.dateparse import (
+    parse_date, parse_datetime, parse_duration, parse_time)
+from django.utils.duration import duration_string
+from django.utils.encoding import force_bytes, force_text
+
+CURSOR_NEXT = 'n'
+CURSOR_PREVIOUS = 'p'
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def _parse(parser):
+    def parse(value):
+        parsed = parser(value)
+        if parsed is None:
+            raise ValueError(value)
+        return parsed
+    return parse
+
+
+# Ordering values that JSON can't represent exactly are stored in cursors as
+# `{type: string}`, and turned back into values of the same type with these
+CURSOR_VALUE_PARSERS = {
+    'datetime': _parse(parse_datetime),
+    'date': _parse(parse_date),
+    'time': _parse(parse_time),
+    'duration': _parse(parse_duration),
+    'decimal': decimal.Decimal,
+    'uuid': uuid.UUID,
+}
+
+
+def encode_cursor_value(value):
+    """
+    Returns a JSON-serialisable version of an ordering value, which
+    `decode_cursor_value()` turns back into an equal value. Temporal values
+    keep their full (microsecond) precision, so that seeking past them never
+    skips or repeats rows.
+    """
+    if isinstance(value, datetime.datetime):
+        return {'datetime': value.isoformat()}
+    if isinstance(value, datetime.date):
+        return {'date': value.isoformat()}
+    if isinstance(value, datetime.time):
+        return {'time': value.isoformat()}
+    if isinstance(value, datetime.timedelta):
+        return {'duration': duration_string(value)}
+    if isinstance(value, decimal.Decimal):
+        return {'decimal': force_text(value)}
+    if isinstance(value, uuid.UUID):
+        return {'uuid': value.hex}
+    return value
+
+
+def decode_cursor_value(value):
+    if not isinstance(value, dict):
+        return value
+    if len(value) != 1:
+        raise ValueError(value)
+    (type_name, string), = value.items()
+    if type_name not in CURSOR_VALUE_PARSERS:
+        raise ValueError(value)
+    try:
+        return CURSOR_VALUE_PARSERS[type_name](string)
+    except decimal.InvalidOperation:
+        raise ValueError(value)
+
+
+def orders_by_related_model(model, field_name):
+    """
+    Returns a boolean indicating whether ordering `model` by `field_name`
+    sorts by something other than the value of `field_name`. Ordering by a
+    relation (e.g. `order_by('author')`) sorts by the related model's
+    `Meta.ordering` where it has one, whereas `values()` and filters use the
+    relation's key (`author_id`), so cursors would skip or repeat rows.
+    """
+    opts = model._meta
+    field = None
+    for name in field_name.split(LOOKUP_SEP):
+        if opts is None:
+            return False
+        try:
+            field = opts.pk if name == 'pk' else opts.get_field(name)
+        except FieldDoesNotExist:
+            # e.g. an annotation, which is selected and sorted as it is
+            return False
+        if not field.is_relation or name == getattr(field, 'attname', None):
+            opts = None
+            continue
+        opts = field.related_model._meta
+    if field is None or not field.is_relation or opts is None:
+        return False
+    if field.many_to_many or field.one_to_many:
+        return True
+    return bool(opts.ordering)
+
+
+class CountedPaginator(Paginator):
+    """
+    A `Paginator` that uses a count supplied up front, instead of running its
+    own `COUNT(*)` query. If the supplied count isn't exact (it has an
+    `exact` attribute that is `False`), pages are fetched with one extra row,
+    so that the presence of a next page can be determined without relying on
+    the count.
+    """
+
+    def __init__(self, object_list, per_page, count, **kwargs):
+        self._supplied_count = count
+        self.count_is_exact = getattr(count, 'exact', True)
+        super(CountedPaginator, self).__init__(object_list, per_page, **kwargs)
+
+    @property
+    def count(self):
+        return self._supplied_count
+
+    def validate_number(self, number):
+        if self.count_is_exact:
+            return super(CountedPaginator, self).validate_number(number)
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger('That page number is not an integer')
+        if number < 1:
+            raise EmptyPage('That page number is less than 1')
+        return number
+
+    def page(self, number):
+        if self.count_is_exact:
+            return super(CountedPaginator, self).page(number)
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage('That page contains no results')
+        return InexactCountPage(
+            rows[:self.per_page], number, self,
+            has_next=len(rows) > self.per_page)
+
+
+class InexactCountPage(Page):
+
+    def __init__(self, object_list, number, paginator, has_next):
+        super(InexactCountPage, self).__init__(object_list, number, paginator)
+        self._has_next = has_next
+
+    def has_next(self):
+        return self._has_next
+
+    def end_index(self):
+        return self.start_index() + len(self.object_list) - 1
+
+
+class KeysetPaginator(object):
+    """
+    An alternative to Django's `Paginator` that pages through a queryset by
+    'seeking' past the ordering values of the last row seen, rather than by
+    using LIMIT/OFFSET. The cost of fetching a page therefore stays the same
+    no matter how deep into the results a user goes.
+
+    The queryset must already be ordered deterministically (IndexView
+    guarantees this by always adding the primary key to the ordering).
+    """
+
+    def __init__(self, queryset, per_page):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.ordering = list(queryset.query.order_by)
+        self.field_names = [f.lstrip('-') for f in self.ordering]
+        self.nulls_largest = getattr(
+            connections[queryset.db].features, 'nulls_order_largest', False)
+
+    @staticmethod
+    def supports_queryset(queryset):
+        """
+        Keyset pagination is only possible when every ordering term is a
+        plain field reference (so that a value can be captured for it), and
+        the rows are sorted by the value that is captured
+        """
+        ordering = queryset.query.order_by
+        if not ordering:
+            return False
+        for term in ordering:
+            if not isinstance(term, six.string_types):
+                return False
+            if term == '?' or '.' in term:
+                return False
+            if orders_by_related_model(queryset.model, term.lstrip('-')):
+                return False
+        return True
+
+    def encode_cursor(self, direction, values):
+        data = json.dumps({
+            'd': direction,
+            'o': self.ordering,
+            'v': [encode_cursor_value(value) for value in values],
+        }, separators=(',', ':'))
+        return force_text(base64.urlsafe_b64encode(force_bytes(data)))
+
+    def decode_cursor(self, cursor):
+        try:
+            data = json.loads(force_text(
+                base64.urlsafe_b64decode(force_bytes(cursor))))
+            direction, ordering, values = data['d'], data['o'], data['v']
+            values = [decode_cursor_value(value) for value in values]
+        except (TypeError, ValueError, KeyError):
+            raise InvalidCursor(cursor)
+        if (
+            direction not in (CURSOR_NEXT, CURSOR_PREVIOUS) or
+            ordering != self.ordering or
+            len(values) != len(self.field_names)
+        ):
+            # Cursors are only valid for the ordering they were created with
+            raise InvalidCursor(cursor)
+        return direction, values
+
+    def _after(self, field_name, value, descending):
+        """
+        Return a Q object matching rows that sort strictly after `value` for
+        a single ordering term, taking the database's NULL placement into
+        account
+        """
+        nulls_after = self.nulls_largest != descending
+        if value is None:
+            if nulls_after:
+                # Nothing sorts after NULL
+                return Q(pk__in=[])
+            return Q(**{'%s__isnull' % field_name: False})
+        lookup = '%s__lt' if descending else '%s__gt'
+        q = Q(**{lookup % field_name: value})
+        if nulls_after:
+            q |= Q(**{'%s__isnull' % field_name: True})
+        return q
+
+    def _equal(self, field_name, value):
+        if value is None:
+            return Q(**{'%s__isnull' % field_name: True})
+        return Q(**{field_name: value})
+
+    def get_seek_filter(self, values, reverse=False):
+        """
+        Return a Q object matching all rows that come after the row with the
+        supplied ordering `values` (or before it, when `reverse` is True),
+        i.e. (a > x) OR (a = x AND b > y) OR (a = x AND b = y AND c > z) ...
+        """
+        seek = Q(pk__in=[])
+        for i, term in enumerate(self.ordering):
+            descending = term.startswith('-') != reverse
+            q = self._after(self.field_names[i], values[i], descending)
+            for j in range(i):
+                q &= self._equal(self.field_names[j], values[j])
+            seek |= q
+        return seek
+
+    def _get_seek_queryset(self, cursor):
+        """
+        Returns a `(queryset, values, backwards)` tuple, where `queryset`
+        begins at the position identified by `cursor`, in the direction the
+        page should be read
+        """
+        direction, values = CURSOR_NEXT, None
+        if cursor:
+            direction, values = self.decode_cursor(cursor)
+        backwards = direction == CURSOR_PREVIOUS
+
+        qs = self.queryset
+        if values is not None:
+            qs = qs.filter(self.get_seek_filter(values, reverse=backwards))
+        if backwards:
+            qs = qs.reverse()
+        return qs, values, backwards
+
+    def _trim_rows(self, rows, values, backwards):
+        """
+        Takes up to `per_page + 1` rows fetched from the queryset returned by
+        `_get_seek_queryset`, and returns a `(rows, has_previous, has_next)`
+        tuple, with `rows` in the correct order
+        """
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+            return rows, has_more, True
+        return rows, values is not None, has_more
+
+    def page(self, cursor=None):
+        """
+        Return a `KeysetPage` for the supplied cursor, or the first page if no
+        cursor is supplied. Raises `InvalidCursor` if the cursor is malformed
+        or was created for a different ordering.
+        """
+        qs, values, backwards = self._get_seek_queryset(cursor)
+
+        # Fetch ordering values (plus one extra row, to find out whether
+        # there is another page beyond this one) with a cheap, index-driven
+        # query, before fetching the full objects for the page by pk.
+        rows = list(qs.values_list('pk', *self.field_names)[
+            :self.per_page + 1])
+        rows, has_previous, has_next = self._trim_rows(
+            rows, values, backwards)
+
+        pks = [row[0] for row in rows]
+        objects = {}
+        if pks:
+            objects = {
+                obj.pk: obj for obj in self.queryset.filter(pk__in=pks)
+            }
+        object_list = [objects[pk] for pk in pks if pk in objects]
+
+        return KeysetPage(
+            self, object_list,
+            first_values=rows[0][1:] if rows else None,
+            last_values=rows[-1][1:] if rows else None,
+            has_previous=has_previous, has_next=has_next)
+
+    def page_values(self, fields, cursor=None):
+        """
+        Like `page()`, but the page's `object_list` is a list of dictionaries
+        containing the values of `fields` for each row, which are fetched with
+        `values()` in a single query, without creating model instances.
+        """
+        qs, values, backwards = self._get_seek_queryset(cursor)
+        names = list(fields) + [
+            f for f in self.field_names if f not in fields]
+        rows = list(qs.values(*names)[:self.per_page + 1].iterator())
+        rows, has_previous, has_next = self._trim_rows(
+            rows, values, backwards)
+
+        def get_ordering_values(row):
+            return [row[f] for f in self.field_names]
+
+        return KeysetPage(
+            self, [{f: row[f] for f in fields} for row in rows],
+            first_values=get_ordering_values(rows[0]) if rows else None,
+            last_values=get_ordering_values(rows[-1]) if rows else None,
+            has_previous=has_previous, has_next=has_next)
+
+    def chunk_cursors(self):
+        """
+        Yields a cursor for the start of every page after the first, so that
+        the pages can be fetched independently (e.g. in parallel). Only the
+        ordering values of the last row of each page are fetched.
+        """
+        values = None
+        while True:
+            qs = self.queryset
+            if values is not None:
+                qs = qs.filter(self.get_seek_filter(values))
+            rows = list(qs.values_list(*self.field_names)[
+                self.per_page - 1:self.per_page + 1])
+            if len(rows) < 2:
+                # There are no rows beyond this page
+                return
+            values = list(rows[0])
+            yield self.encode_cursor(CURSOR_NEXT, values)
+
+
+class KeysetPage(object):
+
+    def __init__(self, paginator, object_list, first_values, last_values,
+                 has_previous, has_next):
+        self.paginator = paginator
+        self.object_list = object_list
+        self.first_values = first_values
+        self.last_values = last_values
+        self._has_previous = has_previous and first_values is not None
+        self._has_next = has_next and last_values is not None
+
+    def __repr__(self):
+        return '<KeysetPage: %s objects>' % len(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self.has_previous() or self.has_next()
+
+    def next_cursor(self):
+        if not self.has_next():
+            return None
+        return self.paginator.encode_cursor(CURSOR_NEXT, self.last_values)
+
+    def previous_cursor(self):
+        if not self.has_previous():
+            return None
+        return self.paginator.encode_cursor(
+            CURSOR_PREVIOUS, self.first_values)
@@ -0,0 +1,33 @@
+from django.contrib.auth.models import Permission
+from django.db.models.signals import post_delete, post_save
+
+# Permissions are only created or removed by migrations (or by an admin
+# editing them directly), so the codenames for each model are only looked
+# up once per process
+_model_permission_codenames = {}
+
+
+def get_model_permission_codenames(model):
+    """
+    Returns the codenames of all of the permissions that exist for `model`
+    """
+    key = model._meta.label_lower
+    if key not in _model_permission_codenames:
+        _model_permission_codenames[key] = frozenset(
+            Permission.objects.filter(
+                content_type__app_label=model._meta.app_label,
+                content_type__model=model._meta.model_name,
+            ).values_list('codename', flat=True))
+    return _model_permission_codenames[key]
+
+
+def clear_model_permission_codenames(sender, **kwargs):
+    _model_permission_codenames.clear()
+
+
+def connect_permission_cache_invalidation():
+    uid = 'wagtailmodeladmin_permission_invalidation'
+    post_save.connect(clear_model_permission_codenames, sender=Permission,
+                      dispatch_uid=uid)
+    post_delete.connect(clear_model_permission_codenames, sender=Permission,
+                        dispatch_uid=uid)
@@ -1,4 +1,3 @@
-from django.contrib.auth.models import Permission
 from wagtailmodeladmin.helpers import PermissionHelper
 
 
@@ -7,13 +6,7 @@ class ReadOnlyPermissionHelper(PermissionHelper):
         return False
 
     def has_list_permission(self, user):
-        try:
-            list_perm_codename = 'list_%s' % self.opts.model_name
-            perm = Permission.objects.get(
-                content_type__app_label=self.opts.app_label,
-                codename=list_perm_codename,
-            )
-            return user.has_perm(perm)
-        except Permission.DoesNotExist:
-            pass
+        list_perm_codename = 'list_%s' % self.opts.model_name
+        if list_perm_codename in self.get_all_model_permission_codenames():
+            return self.has_specific_permission(user, list_perm_codename)
         return super(ReadOnlyPermissionHelper, self).has_list_permission(user)
@@ -0,0 +1,174 @@
+import logging
+import threading
+
+from django.db import connection
+from django.db.models.signals import post_init, post_save
+from django.utils.six.moves import queue
+
+from wagtail.wagtailimages.models import Filter, get_image_model
+
+logger = logging.getLogger('wagtailmodeladmin')
+
+# The filter spec used to display images in InspectView
+INSPECT_IMAGE_FILTER_SPEC = 'max-400x400'
+
+# Filters rarely change once created, so each is only looked up once per
+# process
+_filters = {}
+
+
+def get_filter(spec):
+    """
+    Returns the `Filter` for `spec`, creating it if necessary
+    """
+    if spec not in _filters:
+        _filters[spec] = Filter.objects.get_or_create(spec=spec)[0]
+    return _filters[spec]
+
+
+def get_focal_point_key(fltr, image):
+    """
+    Returns the key that `image.get_rendition(fltr)` would look its rendition
+    up with (the name of the method that works this out varies between
+    Wagtail versions), or `None` if it can't be found
+    """
+    for method_name in ('get_cache_key', 'get_vary_key'):
+        method = getattr(fltr, method_name, None)
+        if method is not None:
+            return method(image)
+    return None
+
+
+def prefetch_renditions(images, spec):
+    """
+    Finds the renditions of all of the supplied images for `spec`, fetching
+    existing renditions with a single query and only generating those that
+    are missing, and stores them on the images for `get_rendition()`
+    """
+    images = [image for image in images if image]
+    if not images:
+        return
+    fltr = get_filter(spec)
+    rendition_model = images[0].renditions.model
+    existing = {}
+    renditions = rendition_model._default_manager.filter(
+        image_id__in=set(image.pk for image in images), filter=fltr)
+    for rendition in renditions:
+        existing.setdefault(rendition.image_id, []).append(rendition)
+
+    for image in images:
+        key = get_focal_point_key(fltr, image)
+        rendition = None
+        for candidate in existing.get(image.pk, []):
+            if key is None or candidate.focal_point_key == key:
+                rendition = candidate
+                break
+        if rendition is None:
+            rendition = image.get_rendition(fltr)
+        try:
+            cached = image._wagtailmodeladmin_renditions
+        except AttributeError:
+            cached = image._wagtailmodeladmin_renditions = {}
+        cached[spec] = rendition
+
+
+def get_rendition(image, spec):
+    """
+    Returns the rendition of `image` for `spec`, using one found by
+    `prefetch_renditions()` where available
+    """
+    cached = getattr(image, '_wagtailmodeladmin_renditions', {})
+    if spec in cached:
+        return cached[spec]
+    return image.get_rendition(get_filter(spec))
+
+
+def generate_renditions(image_ids, spec):
+    """
+    Makes sure the images with the supplied ids all have renditions for
+    `spec`, generating any that are missing. Returns the number of images.
+    """
+    images = list(get_image_model()._default_manager.filter(pk__in=image_ids))
+    prefetch_renditions(images, spec)
+    return len(images)
+
+
+class RenditionWorker(object):
+    """
+    Generates renditions in a background thread in the current process,
+    so that the request that queues them doesn't have to wait. The thread
+    is started when the first rendition is queued.
+    """
+
+    def __init__(self):
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def add(self, image_id, spec):
+        with self.lock:
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self.run)
+                self.thread.daemon = True
+                self.thread.start()
+        self.queue.put((image_id, spec))
+
+    def run(self):
+        while True:
+            image_id, spec = self.queue.get()
+            try:
+                generate_renditions([image_id], spec)
+            except Exception:
+                logger.exception(
+                    "Failed to generate '%s' rendition for image %s",
+                    spec, image_id)
+            finally:
+                connection.close()
+                self.queue.task_done()
+
+
+rendition_worker = RenditionWorker()
+
+
+def connect_rendition_warmup(model_admin):
+    """
+    Queues the renditions returned by `model_admin.get_rendition_specs()`
+    for generation by `rendition_worker` whenever an image is newly attached
+    to an instance of its model. The image ids each instance was loaded with
+    are recorded, so that saves that don't change them are ignored.
+    """
+    specs = [
+        (model_admin.opts.get_field(field_name).attname, spec)
+        for field_name, spec in model_admin.get_rendition_specs()
+    ]
+    attnames = set(attname for attname, spec in specs)
+
+    def get_image_ids(instance):
+        # Deferred fields are left out, rather than loaded
+        return dict(
+            (attname, instance.__dict__[attname])
+            for attname in attnames if attname in instance.__dict__)
+
+    def record_image_ids(sender, instance, **kwargs):
+        instance._wagtailmodeladmin_image_ids = get_image_ids(instance)
+
+    def warm_renditions(sender, instance, created=False, **kwargs):
+        previous = {}
+        if not created:
+            previous = getattr(instance, '_wagtailmodeladmin_image_ids', {})
+        current = get_image_ids(instance)
+        for attname, spec in specs:
+            image_id = current.get(attname)
+            if image_id and image_id != previous.get(attname):
+                rendition_worker.add(image_id, spec)
+        instance._wagtailmodeladmin_image_ids = current
+
+    model_admin_class = model_admin.__class__
+    dispatch_uid = 'wagtailmodeladmin_rendition_warmup_%s.%s' % (
+        model_admin_class.__module__, model_admin_class.__name__)
+    post_init.connect(
+        record_image_ids, sender=model_admin.model, weak=False,
+        dispatch_uid=dispatch_uid)
+    post_save.connect(
+        warm_renditions, sender=model_admin.model, weak=False,
+        dispatch_uid=dispatch_uid)
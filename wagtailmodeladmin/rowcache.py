@@ -0,0 +1,58 @@
+import hashlib
+
+from django.core.cache import cache
+from django.utils.encoding import force_bytes, force_text
+from django.utils.safestring import mark_safe
+from django.utils.translation import get_language
+
+
+class RowCache(object):
+    """
+    Caches the rendered cells (including action buttons) of each row in
+    IndexView's results, when `list_row_cache_version_field` is set on the
+    model_admin. Rows are keyed on the model_admin, the columns being
+    displayed, the object's pk and the value of its version field (e.g. a
+    'last modified' timestamp, so that changed objects are re-rendered), the
+    user's permission fingerprint (as the buttons vary by permission) and the
+    active language.
+    """
+
+    def __init__(self, view):
+        model_admin = view.model_admin
+        self.version_field = model_admin.list_row_cache_version_field
+        self.timeout = model_admin.list_row_cache_timeout
+        model_admin_class = model_admin.__class__
+        self.prefix = repr([
+            '%s.%s' % (model_admin_class.__module__,
+                       model_admin_class.__name__),
+            [self.get_column_key(f) for f in view.list_display],
+            self.get_column_key(view.list_display_add_buttons),
+            view.permission_helper.get_permission_fingerprint(
+                view.request.user),
+            get_language(),
+        ])
+
+    def get_column_key(self, field_name):
+        if callable(field_name):
+            return field_name.__name__
+        return force_text(field_name)
+
+    def get_key(self, obj):
+        version = getattr(obj, self.version_field)
+        digest = hashlib.md5(force_bytes('%s:%s:%s' % (
+            self.prefix, obj.pk, version))).hexdigest()
+        return 'wagtailmodeladmin:row:%s' % digest
+
+    def get_many(self, objects):
+        """
+        Returns a dictionary mapping the keys for `objects` to any cached
+        rows, fetched from the cache in one go
+        """
+        rows = cache.get_many([self.get_key(obj) for obj in objects])
+        return dict((key, mark_safe(row)) for key, row in rows.items())
+
+    def set_many(self, rows):
+        if rows:
+            cache.set_many(
+                dict((key, force_text(row)) for key, row in rows.items()),
+                self.timeout)
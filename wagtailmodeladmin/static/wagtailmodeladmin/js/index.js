@@ -0,0 +1,42 @@
+function initFilterAutocomplete($scope) {
+    $scope.find('.filter-autocomplete').each(function() {
+        var $container = $(this);
+        var $input = $container.find('input');
+        var $results = $container.find('.filter-autocomplete-results');
+        var lookupKwarg = $container.data('lookup-kwarg');
+        var queryString = $container.data('query-string');
+        var timeout;
+
+        $input.on('input', function() {
+            clearTimeout(timeout);
+            timeout = setTimeout(function() {
+                var term = $input.val();
+                if (!term) {
+                    $results.empty();
+                    return;
+                }
+                $.getJSON($container.data('autocomplete-url'), {term: term}, function(data) {
+                    $results.empty();
+                    $.each(data.results, function(i, result) {
+                        var href = queryString + (queryString.length > 1 ? '&' : '') +
+                            encodeURIComponent(lookupKwarg) + '=' + encodeURIComponent(result.value);
+                        $('<li>').append($('<a>').attr('href', href).text(result.label)).appendTo($results);
+                    });
+                });
+            }, 250);
+        });
+    });
+}
+
+$(function() {
+    // When the filter sidebar is lazy-loaded, it is only requested once the
+    // rest of the page (including the results table) has been rendered
+    var $filters = $('#changelist-filter[data-filters-url]');
+    if ($filters.length) {
+        $filters.load($filters.data('filters-url'), function() {
+            initFilterAutocomplete($filters);
+        });
+    } else {
+        initFilterAutocomplete($(document));
+    }
+});
@@ -1,86 +1,176 @@
 from __future__ import unicode_literals
-import datetime
+import io
+import os
 
-import django
-from django.db import models
-from django.template import Library
+from django.conf import settings
+from django.template import Library, TemplateDoesNotExist
 from django.template.loader import get_template
 from django.utils.safestring import mark_safe
-from django.utils.encoding import force_text
 from django.utils.html import format_html
 from django.utils.translation import ugettext as _
-from django.core.exceptions import ObjectDoesNotExist
 
 from django.contrib.admin.templatetags.admin_list import (
     ResultList, result_headers,
 )
-from django.contrib.admin.utils import (
-    display_for_field, display_for_value, lookup_field,
-)
-
-from ..views import PAGE_VAR, SEARCH_VAR
+from ..columns import get_columns
+from ..pagination import KeysetPage
+from ..rowcache import RowCache
+from ..views import CURSOR_VAR, PAGE_VAR, SEARCH_VAR
 
 register = Library()
 
 
-def items_for_result(view, result):
+def items_for_result(view, result, columns=None):
     """
     Generates the actual list of data.
     """
-    model_admin = view.model_admin
-    for field_name in view.list_display:
-        empty_value_display = model_admin.get_empty_value_display()
-        row_classes = ['field-%s' % field_name]
-        try:
-            f, attr, value = lookup_field(field_name, result, model_admin)
-        except ObjectDoesNotExist:
-            result_repr = empty_value_display
-        else:
-            empty_value_display = getattr(attr, 'empty_value_display', empty_value_display)
-            if f is None or f.auto_created:
-                allow_tags = getattr(attr, 'allow_tags', False)
-                boolean = getattr(attr, 'boolean', False)
-                if boolean or not value:
-                    allow_tags = True
-
-                if django.VERSION >= (1, 9):
-                    result_repr = display_for_value(value, empty_value_display, boolean)
-                else:
-                    result_repr = display_for_value(value, boolean)
-                # Strip HTML tags in the resulting text, except if the
-                # function has an "allow_tags" attribute set to True.
-                if allow_tags:
-                    result_repr = mark_safe(result_repr)
-                if isinstance(value, (datetime.date, datetime.time)):
-                    row_classes.append('nowrap')
-            else:
-                if isinstance(f, models.ManyToOneRel):
-                    field_val = getattr(result, f.name)
-                    if field_val is None:
-                        result_repr = empty_value_display
-                    else:
-                        result_repr = field_val
-                else:
-                    if django.VERSION >= (1, 9):
-                        result_repr = display_for_field(value, f, empty_value_display)
-                    else:
-                        result_repr = display_for_field(value, f)
-
-                if isinstance(f, (models.DateField, models.TimeField, models.ForeignKey)):
-                    row_classes.append('nowrap')
-        if force_text(result_repr) == '':
-            result_repr = mark_safe('&nbsp;')
-        row_classes.extend(model_admin.get_extra_class_names_for_field_col(field_name, result))
-        row_attributes_dict = model_admin.get_extra_attrs_for_field_col(field_name, result)
-        row_attributes_dict['class'] = ' ' . join(row_classes)
-        row_attributes = ''.join(' %s="%s"' % (key, val) for key, val in row_attributes_dict.items())
-        row_attributes_safe = mark_safe(row_attributes)
-        yield format_html('<td{}>{}</td>', row_attributes_safe, result_repr)
+    if columns is None:
+        columns = get_columns(view.model_admin, view.list_display)
+    for column in columns:
+        yield column.render_cell(result)
 
 
 def results(view, object_list):
+    columns = get_columns(view.model_admin, view.list_display)
     for item in object_list:
-        yield ResultList(None, items_for_result(view, item))
+        yield ResultList(None, items_for_result(view, item, columns))
+
+
+# The templates that row rendering is split across. If a project overrides
+# any of these, rows are rendered with them; otherwise `result_rows` is used
+# to render each row in a single pass.
+ROW_TEMPLATES = (
+    'wagtailmodeladmin/includes/result_list.html',
+    'wagtailmodeladmin/includes/result_row.html',
+    'wagtailmodeladmin/includes/result_row_value.html',
+)
+TEMPLATE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'templates')
+
+_row_templates_overridden = None
+
+
+def find_template_source(loaders, template_name):
+    """
+    Returns the source of the template that the first of `loaders` able to
+    find `template_name` would load, or `None` if it can't be found
+    """
+    for loader in loaders:
+        if hasattr(loader, 'loaders'):
+            # The cached loader wraps other loaders
+            source = find_template_source(loader.loaders, template_name)
+            if source is not None:
+                return source
+            continue
+        try:
+            return loader.load_template_source(template_name)[0]
+        except (TemplateDoesNotExist, NotImplementedError, AttributeError):
+            continue
+    return None
+
+
+def is_template_overridden(template_name):
+    """
+    Returns a boolean indicating whether `template_name` is being loaded from
+    somewhere other than this app's templates directory. Where a template's
+    origin isn't known (Django 1.8 only records it when debugging), the
+    source the template loaders find is compared with this app's copy.
+    """
+    template = get_template(template_name)
+    # Django 1.8's backend templates don't expose `origin` directly
+    engine_template = getattr(template, 'template', template)
+    origin = getattr(template, 'origin', None) or getattr(
+        engine_template, 'origin', None)
+    name = getattr(origin, 'name', None)
+    if name:
+        return not os.path.abspath(name).startswith(TEMPLATE_DIR)
+    engine = engine_template.engine
+    source = find_template_source(engine.template_loaders, template_name)
+    with io.open(os.path.join(TEMPLATE_DIR, template_name),
+                 encoding=engine.file_charset) as f:
+        return source != f.read()
+
+
+def row_templates_overridden():
+    """
+    Returns a boolean indicating whether any of `ROW_TEMPLATES` have been
+    overridden. The result is cached for the life of the process (unless
+    DEBUG is True).
+    """
+    global _row_templates_overridden
+    if _row_templates_overridden is not None and not settings.DEBUG:
+        return _row_templates_overridden
+    _row_templates_overridden = any(
+        is_template_overridden(name) for name in ROW_TEMPLATES)
+    return _row_templates_overridden
+
+
+def render_button(button):
+    """
+    Renders `button` in the same way as 'includes/button.html'
+    """
+    url = format_html(' href="{}"', button['url']) if button.get('url') else ''
+    target = button.get('target')
+    target = format_html(' target="{}"', target) if target else ''
+    return format_html(
+        '<a{} class="{}" title="{}"{}>{}</a>', url, button['classname'],
+        button['title'], target, button['label'])
+
+
+def result_rows(view, object_list):
+    """
+    Generates a complete `<tr>` element for each object, with action buttons
+    added to the `list_display_add_buttons` column, equivalent to rendering
+    'includes/result_row.html' and 'includes/result_row_value.html' for every
+    row and cell. When `list_row_cache_version_field` is set on the
+    model_admin, rows are fetched from (and added to) a `RowCache`.
+    """
+    columns = get_columns(view.model_admin, view.list_display)
+    try:
+        buttons_index = list(view.list_display).index(
+            view.list_display_add_buttons)
+    except ValueError:
+        buttons_index = None
+
+    def render_cells(obj):
+        buttons = ''
+        if buttons_index is not None:
+            action_buttons = view.get_buttons_for_obj(obj)
+            if action_buttons:
+                buttons = format_html(
+                    '<ul class="actions">{}</ul>', mark_safe(''.join(
+                        format_html('<li>{}</li>', render_button(button))
+                        for button in action_buttons)))
+        return mark_safe(''.join(
+            column.render_cell(obj, buttons if i == buttons_index else '')
+            for i, column in enumerate(columns)))
+
+    row_cache = None
+    cached_rows = {}
+    new_rows = {}
+    if view.model_admin.list_row_cache_version_field:
+        row_cache = RowCache(view)
+        cached_rows = row_cache.get_many(object_list)
+        # Only the rows that aren't cached need anything fetching for them
+        view.prefetch_for_results([
+            obj for obj in object_list
+            if row_cache.get_key(obj) not in cached_rows])
+    else:
+        view.prefetch_for_results(object_list)
+
+    for i, obj in enumerate(object_list):
+        if row_cache is not None:
+            key = row_cache.get_key(obj)
+            cells = cached_rows.get(key)
+            if cells is None:
+                cells = new_rows[key] = render_cells(obj)
+        else:
+            cells = render_cells(obj)
+        yield format_html(
+            '<tr class="{}">{}</tr>', 'odd' if i % 2 == 0 else 'even', cells)
+
+    if row_cache is not None:
+        row_cache.set_many(new_rows)
 
 
 @register.inclusion_tag("wagtailmodeladmin/includes/result_list.html",
@@ -99,17 +189,32 @@ def result_list(context):
     context.update({
         'result_headers': headers,
         'num_sorted_fields': num_sorted_fields,
-        'results': list(results(view, object_list))})
+    })
+    if row_templates_overridden():
+        view.prefetch_for_results(object_list)
+        context.update({
+            'results': list(results(view, object_list)),
+            'rows': None,
+        })
+    else:
+        context.update({
+            'results': None,
+            'rows': list(result_rows(view, object_list)),
+        })
     return context
 
 
 @register.simple_tag
 def pagination_link_previous(current_page, view):
     if current_page.has_previous():
-        previous_page_number0 = current_page.previous_page_number() - 1
+        if isinstance(current_page, KeysetPage):
+            new_params = {CURSOR_VAR: current_page.previous_cursor()}
+        else:
+            previous_page_number0 = current_page.previous_page_number() - 1
+            new_params = {PAGE_VAR: previous_page_number0}
         return format_html(
             '<li class="prev"><a href="%s" class="icon icon-arrow-left">%s</a></li>' %
-            (view.get_query_string({PAGE_VAR: previous_page_number0}), _('Previous'))
+            (view.get_query_string(new_params), _('Previous'))
         )
     return ''
 
@@ -117,10 +222,14 @@ def pagination_link_previous(current_page, view):
 @register.simple_tag
 def pagination_link_next(current_page, view):
     if current_page.has_next():
-        next_page_number0 = current_page.next_page_number() - 1
+        if isinstance(current_page, KeysetPage):
+            new_params = {CURSOR_VAR: current_page.next_cursor()}
+        else:
+            next_page_number0 = current_page.next_page_number() - 1
+            new_params = {PAGE_VAR: next_page_number0}
         return format_html(
             '<li class="next"><a href="%s" class="icon icon-arrow-right-after">%s</a></li>' %
-            (view.get_query_string({PAGE_VAR: next_page_number0}), _('Next'))
+            (view.get_query_string(new_params), _('Next'))
         )
     return ''
 
@@ -140,7 +249,7 @@ def admin_list_filter(view, spec):
     tpl = get_template(template_name)
     return tpl.render({
         'title': spec.title,
-        'choices': list(spec.choices(view)),
+        'choices': view.get_filter_choices(spec),
         'spec': spec,
     })
 
@@ -163,10 +272,9 @@ def result_row_value_display(context, index=0):
     add_action_buttons = False
     item = context['item']
     closing_tag = mark_safe(item[-5:])
-    request = context['request']
-    modeladmin = context['view'].model_admin
-    field_name = modeladmin.get_list_display(request)[index]
-    if field_name == modeladmin.get_list_display_add_buttons(request):
+    view = context['view']
+    field_name = view.list_display[index]
+    if field_name == view.list_display_add_buttons:
         add_action_buttons = True
         item = mark_safe(item[0:-5])
     context.update({
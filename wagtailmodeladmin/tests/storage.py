@@ -0,0 +1,31 @@
+from collections import defaultdict
+
+from django.core.files.storage import FileSystemStorage
+
+
+class CountingStorage(FileSystemStorage):
+    """
+    Stands in for a remote storage backend (such as S3), keeping count of
+    the calls that would each involve a request to it
+    """
+    calls = defaultdict(int)
+
+    @classmethod
+    def reset_calls(cls):
+        cls.calls.clear()
+
+    def _open(self, name, mode='rb'):
+        self.calls['open'] += 1
+        return super(CountingStorage, self)._open(name, mode)
+
+    def exists(self, name):
+        self.calls['exists'] += 1
+        return super(CountingStorage, self).exists(name)
+
+    def size(self, name):
+        self.calls['size'] += 1
+        return super(CountingStorage, self).size(name)
+
+    def modified_time(self, name):
+        self.calls['modified_time'] += 1
+        return super(CountingStorage, self).modified_time(name)
@@ -0,0 +1,49 @@
+from __future__ import unicode_literals
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from wagtail.wagtailcore.models import Page
+
+from .testapp.models import EventPage
+from .testapp.wagtail_hooks import EventPageModelAdmin
+
+
+class TestChooseParentView(TestCase):
+    url = '/admin/modeladmin/testapp/eventpage/choose_parent/'
+
+    def setUp(self):
+        get_user_model().objects.create_superuser(
+            'admin', 'admin@example.com', 'password')
+        self.client.login(username='admin', password='password')
+        home = Page.objects.get(depth=2)
+        for i in range(12):
+            home.add_child(instance=EventPage(
+                title='Event %d' % i, slug='event-%d' % i))
+
+    def assertRendersOnePage(self, response):
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(
+            response, 'type="radio"',
+            count=EventPageModelAdmin.choose_parent_per_page)
+
+    def test_get(self):
+        self.assertRendersOnePage(self.client.get(self.url))
+
+    def test_get_later_page(self):
+        response = self.client.get(self.url, {'p': 1})
+        self.assertRendersOnePage(response)
+        self.assertContains(response, 'Event 7')
+        self.assertNotContains(response, 'Event 2<')
+
+    def test_invalid_post(self):
+        response = self.client.post(self.url, {'parent_page': 'foo'})
+        self.assertRendersOnePage(response)
+        self.assertTrue(response.context['form'].errors)
+
+    def test_valid_post(self):
+        parent = EventPage.objects.get(title='Event 11')
+        response = self.client.post(self.url, {'parent_page': parent.pk})
+        self.assertRedirects(
+            response, '/admin/pages/add/testapp/eventpage/%d/' % parent.pk,
+            fetch_redirect_response=False)
@@ -0,0 +1,161 @@
+from __future__ import unicode_literals
+
+import datetime
+
+import django
+from django.contrib.admin import utils as admin_utils
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import models
+from django.test import TestCase
+from django.utils.encoding import force_text
+from django.utils.html import format_html
+from django.utils.safestring import mark_safe
+
+from wagtailmodeladmin import columns
+from wagtailmodeladmin.columns import get_columns
+from wagtailmodeladmin.templatetags import wagtailmodeladmin_tags
+from wagtailmodeladmin.templatetags.wagtailmodeladmin_tags import (
+    items_for_result,
+)
+
+from .testapp.models import Author, Book
+from .testapp.wagtail_hooks import BookModelAdmin
+
+
+def items_for_result_by_lookup(view, result):
+    """
+    Renders cells the way `items_for_result` did before columns were
+    compiled, resolving every `list_display` entry for every cell
+    """
+    model_admin = view.model_admin
+    for field_name in view.list_display:
+        empty_value_display = model_admin.get_empty_value_display()
+        row_classes = ['field-%s' % field_name]
+        try:
+            f, attr, value = admin_utils.lookup_field(
+                field_name, result, model_admin)
+        except ObjectDoesNotExist:
+            result_repr = empty_value_display
+        else:
+            empty_value_display = getattr(
+                attr, 'empty_value_display', empty_value_display)
+            if f is None or f.auto_created:
+                allow_tags = getattr(attr, 'allow_tags', False)
+                boolean = getattr(attr, 'boolean', False)
+                if boolean or not value:
+                    allow_tags = True
+                if django.VERSION >= (1, 9):
+                    result_repr = admin_utils.display_for_value(
+                        value, empty_value_display, boolean)
+                else:
+                    result_repr = admin_utils.display_for_value(value, boolean)
+                if allow_tags:
+                    result_repr = mark_safe(result_repr)
+                if isinstance(value, (datetime.date, datetime.time)):
+                    row_classes.append('nowrap')
+            else:
+                if django.VERSION >= (1, 9):
+                    result_repr = admin_utils.display_for_field(
+                        value, f, empty_value_display)
+                else:
+                    result_repr = admin_utils.display_for_field(value, f)
+                if isinstance(f, (models.DateField, models.TimeField,
+                                  models.ForeignKey)):
+                    row_classes.append('nowrap')
+        if force_text(result_repr) == '':
+            result_repr = mark_safe('&nbsp;')
+        row_classes.extend(model_admin.get_extra_class_names_for_field_col(
+            result, field_name))
+        row_attributes_dict = model_admin.get_extra_attrs_for_field_col(
+            result, field_name)
+        row_attributes_dict['class'] = ' '.join(row_classes)
+        row_attributes = ''.join(
+            ' %s="%s"' % (key, val)
+            for key, val in row_attributes_dict.items())
+        yield format_html(
+            '<td{}>{}</td>', mark_safe(row_attributes), result_repr)
+
+
+class ColumnsBookModelAdmin(BookModelAdmin):
+    list_display = (
+        'title', 'author', 'published', 'manuscript', 'author_born',
+        'is_long_title', '__str__')
+
+    def author_born(self, obj):
+        return obj.author.date_of_birth
+
+    def is_long_title(self, obj):
+        return len(obj.title) > 10
+    is_long_title.boolean = True
+
+
+class View(object):
+    """ Provides what `items_for_result` needs from an IndexView """
+    def __init__(self, model_admin):
+        self.model_admin = model_admin
+        self.list_display = model_admin.list_display
+
+
+class TestColumns(TestCase):
+
+    def setUp(self):
+        self.view = View(ColumnsBookModelAdmin())
+        author = Author.objects.create(
+            name='Author', date_of_birth=datetime.date(1950, 1, 1))
+        Book.objects.create(author=author, title='A book')
+        Book.objects.create(author=author, title='A much longer title',
+                            published=False)
+        self.books = list(Book.objects.select_related('author'))
+
+    def test_columns_are_compiled_once(self):
+        model_admin = self.view.model_admin
+        columns = get_columns(model_admin, model_admin.list_display)
+        self.assertIs(
+            get_columns(model_admin, model_admin.list_display), columns)
+        self.assertEqual(
+            [column.kind for column in columns],
+            ['field', 'field', 'field', 'field', 'admin_method',
+             'admin_method', 'model_attr'])
+
+    def test_output_matches_lookup_field(self):
+        for book in self.books:
+            self.assertEqual(
+                list(items_for_result(self.view, book)),
+                list(items_for_result_by_lookup(self.view, book)))
+
+    def count_field_lookups(self):
+        """
+        Returns a list that the name of each function used to resolve
+        `list_display` entries is appended to whenever it's called
+        """
+        calls = []
+
+        def count(module, name):
+            original = getattr(module, name)
+
+            def counted(*args, **kwargs):
+                calls.append(name)
+                return original(*args, **kwargs)
+            setattr(module, name, counted)
+            self.addCleanup(setattr, module, name, original)
+
+        count(admin_utils, 'lookup_field')
+        count(admin_utils, '_get_non_gfk_field')
+        for module in (columns, wagtailmodeladmin_tags):
+            for name in ('lookup_field', '_get_non_gfk_field'):
+                if hasattr(module, name):
+                    count(module, name)
+        return calls
+
+    def test_fields_are_not_resolved_per_cell(self):
+        model_admin = self.view.model_admin
+        get_columns(model_admin, model_admin.list_display)
+        calls = self.count_field_lookups()
+        for book in self.books * 10:
+            list(items_for_result(self.view, book))
+        self.assertEqual(calls, [])
+
+        # Resolving each cell with lookup_field() is counted
+        list(items_for_result_by_lookup(self.view, self.books[0]))
+        self.assertEqual(
+            calls.count('lookup_field'), len(model_admin.list_display))
@@ -0,0 +1,54 @@
+from __future__ import unicode_literals
+
+import json
+
+from django.contrib.auth import get_user_model
+from django.test import RequestFactory, TestCase
+
+from wagtailmodeladmin.filters import HighCardinalityRelatedFieldListFilter
+
+from .testapp.models import Author, Book
+from .testapp.wagtail_hooks import BookModelAdmin
+
+
+class PublishedBookModelAdmin(BookModelAdmin):
+    list_filter = (('author', HighCardinalityRelatedFieldListFilter),)
+
+    def get_queryset(self, request):
+        qs = super(PublishedBookModelAdmin, self).get_queryset(request)
+        return qs.filter(published=True)
+
+
+class TestHighCardinalityRelatedFieldListFilter(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_superuser(
+            'admin', 'admin@example.com', 'password')
+        self.model_admin = PublishedBookModelAdmin()
+        self.visible = Author.objects.create(name='Visible')
+        self.hidden = Author.objects.create(name='Hidden')
+        Book.objects.create(author=self.visible, title='Published')
+        for i in range(3):
+            Book.objects.create(
+                author=self.hidden, title='Unpublished', published=False)
+
+    def get_filter(self, params=None):
+        request = RequestFactory().get('/', params or {})
+        request.user = self.user
+        return HighCardinalityRelatedFieldListFilter(
+            Book._meta.get_field('author'), request, dict(params or {}),
+            Book, self.model_admin, field_path='author')
+
+    def test_choices_only_include_values_in_listing(self):
+        self.assertEqual(
+            self.get_filter().lookup_choices,
+            [(self.visible.pk, 'Visible')])
+
+    def test_autocomplete_matches_choices(self):
+        view = self.model_admin.filter_autocomplete_view
+        request = RequestFactory().get(
+            '/', {'field': 'author', 'term': 'i'})
+        request.user = self.user
+        results = json.loads(view(request).content.decode())['results']
+        self.assertEqual(
+            results, [{'value': str(self.visible.pk), 'label': 'Visible'}])
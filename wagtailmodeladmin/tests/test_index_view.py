@@ -0,0 +1,69 @@
+from __future__ import unicode_literals
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+
+from wagtailmodeladmin.views import IndexView
+
+from .testapp.models import Author, Book
+
+
+class TestIndexViewQueries(TestCase):
+    url = '/admin/modeladmin/testapp/book/'
+
+    def setUp(self):
+        cache.clear()
+        get_user_model().objects.create_superuser(
+            'admin', 'admin@example.com', 'password')
+        self.client.login(username='admin', password='password')
+        self.create_books(5)
+        # Permission codenames are looked up once per process, so make sure
+        # they aren't counted against the request being tested
+        self.client.get(self.url)
+
+    def create_books(self, count):
+        for i in range(Book.objects.count(), Book.objects.count() + count):
+            author = Author.objects.create(name='Author %d' % i)
+            Book.objects.create(author=author, title='Book %d' % i)
+
+    def test_number_of_queries(self):
+        # Site, session, user, the choices for the 'author' filter, the
+        # total count and the page of results
+        with self.assertNumQueries(6):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_number_of_queries_when_searching(self):
+        # As above, plus a count of the search results
+        with self.assertNumQueries(7):
+            response = self.client.get(self.url, {'q': 'Book'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_number_of_queries_when_filtering_and_ordering(self):
+        # As above, plus a count of the filtered results
+        with self.assertNumQueries(7):
+            response = self.client.get(
+                self.url, {'published__exact': '1', 'o': '1'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_number_of_queries_does_not_grow_with_results(self):
+        self.create_books(20)
+        with self.assertNumQueries(6):
+            response = self.client.get(self.url)
+        self.assertEqual(len(response.context['object_list']), 25)
+
+    def test_queryset_is_built_once(self):
+        calls = []
+        get_filters = IndexView.get_filters
+
+        def counting_get_filters(view, request):
+            calls.append(request)
+            return get_filters(view, request)
+
+        IndexView.get_filters = counting_get_filters
+        try:
+            self.client.get(self.url, {'q': 'Book', 'published__exact': '1'})
+        finally:
+            IndexView.get_filters = get_filters
+        self.assertEqual(len(calls), 1)
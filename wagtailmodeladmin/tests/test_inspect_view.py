@@ -0,0 +1,70 @@
+from __future__ import unicode_literals
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.test import TestCase
+
+from wagtail.wagtaildocs.models import Document
+
+from .storage import CountingStorage
+from .testapp.models import Author, Book
+
+
+class TestInspectViewDocumentStorage(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        get_user_model().objects.create_superuser(
+            'admin', 'admin@example.com', 'password')
+        self.client.login(username='admin', password='password')
+        self.document = Document(title='Manuscript')
+        self.document.file.save(
+            'manuscript.txt', ContentFile(b'A' * 2048), save=False)
+        self.document.save()
+        self.book = Book.objects.create(
+            author=Author.objects.create(name='Author'), title='Book',
+            manuscript=self.document)
+        self.url = '/admin/modeladmin/testapp/book/inspect/%d/' % (
+            self.book.pk)
+        CountingStorage.reset_calls()
+
+    def tearDown(self):
+        self.document.file.delete(save=False)
+
+    def test_document_field_display(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Manuscript <span class="meta">'
+                                      '(TXT, 2.0\xa0KB)</span>')
+
+    def test_file_size_is_only_read_from_storage_once(self):
+        self.client.get(self.url)
+        self.assertEqual(CountingStorage.calls['size'], 1)
+        CountingStorage.reset_calls()
+
+        # Later views use the cached size
+        for i in range(3):
+            response = self.client.get(self.url)
+        self.assertContains(response, '2.0\xa0KB')
+        self.assertEqual(dict(CountingStorage.calls), {})
+
+    def test_file_size_stored_on_document_is_used(self):
+        Document.file_size = 4096
+        try:
+            response = self.client.get(self.url)
+        finally:
+            del Document.file_size
+        self.assertContains(response, '4.0\xa0KB')
+        self.assertEqual(dict(CountingStorage.calls), {})
+
+    def test_file_size_is_read_again_for_a_new_file(self):
+        self.client.get(self.url)
+        self.document.file.delete(save=False)
+        self.document.file.save(
+            'manuscript-2.txt', ContentFile(b'A' * 4096), save=True)
+        CountingStorage.reset_calls()
+
+        response = self.client.get(self.url)
+        self.assertContains(response, '4.0\xa0KB')
+        self.assertEqual(CountingStorage.calls['size'], 1)
@@ -0,0 +1,65 @@
+from __future__ import unicode_literals
+
+from django.test import TestCase
+
+from wagtailmodeladmin.pagination import KeysetPaginator
+
+from .testapp.models import Author, Book, EventPage, Publisher
+
+
+class TestKeysetPaginatorSupportsQueryset(TestCase):
+
+    def assertSupported(self, queryset, supported=True):
+        self.assertEqual(
+            KeysetPaginator.supports_queryset(queryset), supported)
+
+    def test_plain_fields(self):
+        self.assertSupported(Book.objects.order_by('title', '-pk'))
+        self.assertSupported(EventPage.objects.order_by('-date', 'pk'))
+
+    def test_relation_to_unordered_model(self):
+        # Sorted by `author_id`, which is what cursors capture
+        self.assertSupported(Book.objects.order_by('author', 'pk'))
+
+    def test_relation_to_ordered_model(self):
+        # Sorted by `Publisher.name`, but cursors would capture `publisher_id`
+        self.assertSupported(
+            Book.objects.order_by('publisher', 'pk'), False)
+        self.assertSupported(
+            Book.objects.order_by('-publisher', 'pk'), False)
+        self.assertSupported(
+            Book.objects.order_by('author__book__publisher', 'pk'), False)
+
+    def test_relation_key_or_field_of_ordered_model(self):
+        self.assertSupported(Book.objects.order_by('publisher_id', 'pk'))
+        self.assertSupported(Book.objects.order_by('publisher__name', 'pk'))
+
+    def test_reverse_relation(self):
+        self.assertSupported(Author.objects.order_by('book', 'pk'), False)
+
+
+class TestKeysetPaginatorPages(TestCase):
+
+    def setUp(self):
+        publishers = [
+            Publisher.objects.create(name=name) for name in 'CBA']
+        for i in range(9):
+            Book.objects.create(
+                author=Author.objects.create(name='Author %d' % (i % 3)),
+                publisher=publishers[i % 3], title='Book %d' % i)
+
+    def get_all_pages(self, queryset):
+        paginator = KeysetPaginator(queryset, 2)
+        page = paginator.page()
+        rows = list(page.object_list)
+        while page.has_next():
+            page = paginator.page(page.next_cursor())
+            rows.extend(page.object_list)
+        return rows
+
+    def test_pages_follow_ordering(self):
+        for ordering in (('publisher_id', 'pk'), ('-author', '-pk'),
+                         ('publisher__name', '-title', 'pk')):
+            queryset = Book.objects.order_by(*ordering)
+            self.assertEqual(self.get_all_pages(queryset), list(queryset))
+
@@ -0,0 +1,45 @@
+from __future__ import unicode_literals
+
+from django.db import models
+from django.utils.encoding import python_2_unicode_compatible
+
+from wagtail.wagtailcore.models import Page
+
+
+@python_2_unicode_compatible
+class Author(models.Model):
+    name = models.CharField(max_length=255)
+    date_of_birth = models.DateField(null=True, blank=True)
+
+    def __str__(self):
+        return self.name
+
+
+@python_2_unicode_compatible
+class Publisher(models.Model):
+    name = models.CharField(max_length=255)
+
+    class Meta:
+        ordering = ('name',)
+
+    def __str__(self):
+        return self.name
+
+
+@python_2_unicode_compatible
+class Book(models.Model):
+    author = models.ForeignKey(Author, on_delete=models.PROTECT)
+    publisher = models.ForeignKey(
+        Publisher, null=True, blank=True, on_delete=models.SET_NULL)
+    title = models.CharField(max_length=255)
+    published = models.BooleanField(default=True)
+    manuscript = models.ForeignKey(
+        'wagtaildocs.Document', null=True, blank=True,
+        on_delete=models.SET_NULL, related_name='+')
+
+    def __str__(self):
+        return self.title
+
+
+class EventPage(Page):
+    date = models.DateField(null=True, blank=True)
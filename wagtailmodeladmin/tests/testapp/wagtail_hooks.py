@@ -0,0 +1,33 @@
+from wagtailmodeladmin.options import (
+    ModelAdmin, PageModelAdmin, wagtailmodeladmin_register)
+
+from .models import Author, Book, EventPage
+
+
+class AuthorModelAdmin(ModelAdmin):
+    model = Author
+    menu_order = 200
+    list_display = ('name', 'date_of_birth')
+    search_fields = ('name',)
+
+
+class BookModelAdmin(ModelAdmin):
+    model = Book
+    menu_order = 300
+    list_display = ('title', 'author', 'published')
+    list_filter = ('author', 'published')
+    list_select_related = ('author',)
+    search_fields = ('title',)
+    inspect_view_enabled = True
+
+
+class EventPageModelAdmin(PageModelAdmin):
+    model = EventPage
+    menu_order = 400
+    list_display = ('title', 'date')
+    choose_parent_per_page = 5
+
+
+wagtailmodeladmin_register(AuthorModelAdmin)
+wagtailmodeladmin_register(BookModelAdmin)
+wagtailmodeladmin_register(EventPageModelAdmin)
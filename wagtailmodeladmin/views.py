@@ -1,3 +1,5 @@
+import datetime
+import hashlib
 import sys
 import operator
 from collections import OrderedDict
@@ -8,17 +10,21 @@ from django import forms
 from django.db.models.fields.related import ForeignObjectRel
 from django.db.models.constants import LOOKUP_SEP
 from django.db.models.sql.constants import QUERY_TERMS
+from django.http import (
+    FileResponse, Http404, JsonResponse, StreamingHttpResponse)
 from django.shortcuts import get_object_or_404, redirect, render
+from django.core.cache import cache
 from django.core.urlresolvers import reverse
 from django.template.defaultfilters import filesizeformat
 
 from django.core.exceptions import ImproperlyConfigured, SuspiciousOperation
 from django.db.models.fields import FieldDoesNotExist
 
-from django.core.paginator import Paginator, InvalidPage
+from django.core.paginator import InvalidPage, Paginator
 
 from django.contrib.admin import FieldListFilter, widgets
 from django.contrib.auth.decorators import login_required
+from django.contrib.messages import get_messages
 from django.utils.decorators import method_decorator
 
 from django.contrib.admin.options import IncorrectLookupParameters
@@ -27,35 +33,54 @@ from django.contrib.admin.utils import (
     get_fields_from_path, lookup_needs_distinct, prepare_lookup_value, quote)
 
 from django.utils import six
-from django.utils.translation import ugettext as _
-from django.utils.encoding import force_text
+from django.utils import timezone
+from django.utils.translation import get_language, ugettext as _
+from django.utils.encoding import force_bytes, force_text
 from django.utils.text import capfirst
 from django.utils.http import urlencode
+from django.utils.six.moves.urllib.parse import parse_qsl
 from django.utils.safestring import mark_safe
 from django.utils.functional import cached_property
+from django.views.decorators.http import condition
 from django.views.generic import TemplateView
 from django.views.generic.edit import FormView
 
 from wagtail.wagtailadmin import messages
 from wagtail.wagtailadmin.edit_handlers import (
     ObjectList, extract_panel_definitions_from_model_class)
-from wagtail.wagtailimages.models import get_image_model, Filter
+from wagtail.wagtailimages.models import get_image_model
+from wagtail.wagtailsearch.backends import get_search_backend
+from wagtail.wagtailsearch.backends.base import FieldError, FilterError
 try:
     from wagtail.wagtaildocs.models import get_document_model
-    Document = get_document_model
 except ImportError:
     from wagtail.wagtaildocs.models import Document
+
+    def get_document_model():
+        return Document
 from wagtail.wagtailcore import __version__ as wagtail_version
+from wagtail.wagtailcore.models import Page
 
 from .helpers import get_url_name
-from .forms import ParentChooserForm
+from .forms import ParentChooserForm, get_ancestor_titles
+from .counts import (
+    COUNT_EXACT, RowCounter, get_facet_counts, get_generation)
+from .pagination import CountedPaginator, KeysetPaginator, InvalidCursor
+from .renditions import (
+    INSPECT_IMAGE_FILTER_SPEC, get_rendition, prefetch_renditions)
+from .exports import (
+    EXPORT_CONTENT_TYPES, JOB_COMPLETE, JOB_FAILED, ExportJob, ExportRenderer,
+    iter_queryset_in_chunks)
 
 # IndexView settings
 ORDER_VAR = 'o'
 ORDER_TYPE_VAR = 'ot'
 PAGE_VAR = 'p'
+CURSOR_VAR = 'c'
 SEARCH_VAR = 'q'
 ERROR_FLAG = 'e'
+FIELDS_VAR = 'fields'
+EXPORT_FORMAT_VAR = 'format'
 IGNORED_PARAMS = (ORDER_VAR, ORDER_TYPE_VAR, SEARCH_VAR)
 
 # Page URL name settings
@@ -250,17 +275,77 @@ class ObjectSpecificView(WMABaseView):
                        args=(self.pk_safe,))
 
 
-class IndexView(WMABaseView):
+class ConditionalGetMixin(object):
+    """
+    Allows GET requests to be answered with '304 Not Modified' (without the
+    page being rendered) when the client's `If-None-Match` or
+    `If-Modified-Since` headers match the current validators, when
+    `last_modified_field` is set on the model_admin. Views must implement
+    `get_validator_data()`.
+    """
+    _validator = None
+
+    def get_validator_data(self, request):
+        """
+        Returns a `(last_modified, data)` tuple, where `last_modified` is a
+        datetime (or `None`) and `data` is a list of other values that the
+        response depends on
+        """
+        raise NotImplementedError
+
+    def get_validator(self, request):
+        if self._validator is None:
+            last_modified, data = self.get_validator_data(request)
+            data = [
+                self.model_admin.__class__.__name__,
+                last_modified.isoformat() if last_modified else None,
+                self.permission_helper.get_permission_fingerprint(
+                    request.user),
+                get_language(),
+            ] + list(data)
+            etag = hashlib.md5(force_bytes(repr(data))).hexdigest()
+            if not isinstance(last_modified, datetime.datetime):
+                last_modified = None
+            self._validator = etag, last_modified
+        return self._validator
+
+    def get_etag(self, request, *args, **kwargs):
+        return self.get_validator(request)[0]
+
+    def get_last_modified(self, request, *args, **kwargs):
+        last_modified = self.get_validator(request)[1]
+        if last_modified is not None and timezone.is_naive(last_modified):
+            last_modified = timezone.make_aware(
+                last_modified, timezone.get_current_timezone())
+        return last_modified
+
+    def conditional_response(self, request, render):
+        """
+        Returns the result of calling `render()`, or a 304 response if the
+        client's copy is still current
+        """
+        if not self.model_admin.last_modified_field:
+            return render()
+        return condition(self.get_etag, self.get_last_modified)(
+            lambda request: render())(request)
+
+
+class IndexView(ConditionalGetMixin, WMABaseView):
 
     flf_class = FieldListFilter
 
     @method_decorator(login_required)
     def dispatch(self, request, *args, **kwargs):
         self.list_display = self.model_admin.get_list_display(request)
+        self.list_display_add_buttons = (
+            self.model_admin.get_list_display_add_buttons(request))
         self.list_filter = self.model_admin.get_list_filter(request)
         self.search_fields = self.model_admin.get_search_fields(request)
+        self.search_backend_name = self.model_admin.search_backend
+        self.list_filter_lazy = self.model_admin.list_filter_lazy
         self.items_per_page = self.model_admin.list_per_page
         self.select_related = self.model_admin.list_select_related
+        self.pagination_mode = self.model_admin.pagination_mode
         request = self.request
 
         # Get search parameters from the query string.
@@ -268,21 +353,43 @@ class IndexView(WMABaseView):
             self.page_num = int(request.GET.get(PAGE_VAR, 0))
         except ValueError:
             self.page_num = 0
+        self.cursor = request.GET.get(CURSOR_VAR)
 
         self.params = dict(request.GET.items())
         if PAGE_VAR in self.params:
             del self.params[PAGE_VAR]
+        if CURSOR_VAR in self.params:
+            del self.params[CURSOR_VAR]
         if ERROR_FLAG in self.params:
             del self.params[ERROR_FLAG]
 
         self.query = request.GET.get(SEARCH_VAR, '')
-        self.queryset = self.get_queryset(request)
 
         if not self.permission_helper.has_list_permission(request.user):
             return permission_denied_response(request)
 
+        # Filter specs, ordering and the final queryset are all worked out
+        # here, just once per request, and reused by everything else (the
+        # template tags included)
+        self.queryset = self.get_queryset(request)
+
         return super(IndexView, self).dispatch(request, *args, **kwargs)
 
+    @cached_property
+    def base_queryset(self):
+        return self.get_base_queryset(self.request)
+
+    @cached_property
+    def editable_pages_only(self):
+        return bool(
+            self.is_pagemodel and self.model_admin.list_editable_pages_only)
+
+    def get_base_queryset(self, request):
+        # Pages are restricted to the user's workspace in SQL (when
+        # `list_editable_pages_only` is True), so that counts, pagination
+        # and filters only consider those pages
+        return self.model_admin.get_index_queryset(request)
+
     @property
     def media(self):
         return forms.Media(
@@ -299,6 +406,10 @@ class IndexView(WMABaseView):
         Returns a tuple containing a queryset to implement the search,
         and a boolean indicating if the results may contain duplicates.
         """
+        if self.search_backend_name and search_term:
+            return self.get_search_backend_results(
+                request, queryset, search_term)
+
         # Apply keyword searches.
         def construct_search(field_name):
             if field_name.startswith('^'):
@@ -310,21 +421,89 @@ class IndexView(WMABaseView):
             else:
                 return "%s__icontains" % field_name
 
-        use_distinct = False
         if self.search_fields and search_term:
             orm_lookups = [construct_search(str(search_field))
                            for search_field in self.search_fields]
+            # Lookups spanning multi-valued relationships are applied in a
+            # subquery, so that they can't duplicate rows in the results
+            multi_valued_lookups = [
+                l for l in orm_lookups if lookup_needs_distinct(self.opts, l)]
             for bit in search_term.split():
                 or_queries = [models.Q(**{orm_lookup: bit})
-                              for orm_lookup in orm_lookups]
+                              for orm_lookup in orm_lookups
+                              if orm_lookup not in multi_valued_lookups]
+                if multi_valued_lookups:
+                    or_queries.append(models.Q(pk__in=self.get_pk_subquery(
+                        reduce(operator.or_, [
+                            models.Q(**{orm_lookup: bit})
+                            for orm_lookup in multi_valued_lookups]))))
                 queryset = queryset.filter(reduce(operator.or_, or_queries))
-            if not use_distinct:
-                for search_spec in orm_lookups:
-                    if lookup_needs_distinct(self.opts, search_spec):
-                        use_distinct = True
-                        break
 
-        return queryset, use_distinct
+        return queryset, False
+
+    def get_pk_subquery(self, *args, **kwargs):
+        """
+        Returns a queryset of primary keys for objects matching the supplied
+        lookups, for use in a `pk__in` filter. IndexView uses this to apply
+        lookups that span multi-valued relationships (many-to-many or reverse
+        foreign keys), so that the outer query never needs `DISTINCT`.
+        """
+        return self.model._default_manager.get_queryset().filter(
+            *args, **kwargs).values('pk')
+
+    search_results_truncated = False
+    search_match_count = None
+
+    def get_search_backend_results(self, request, queryset, search_term):
+        """
+        Used instead of `get_search_results` when `search_backend` is set on
+        the model_admin. The search is run against the model's search index
+        using the named wagtailsearch backend, and the primary keys of the
+        most relevant `search_backend_results_limit` matches are used to
+        filter `queryset`, so that filters and ordering are preserved. No
+        duplicates can result from this.
+
+        Where the backend supports them, the current filters are applied by
+        the backend itself, so that the limit only applies to objects that
+        match them. If there are more matches than the limit,
+        `search_results_truncated` is set to True and the number of matches
+        is stored as `search_match_count`, so that users can be told.
+        """
+        pks, match_count = self.search_backend_pks(queryset, search_term)
+        if match_count is not None:
+            self.search_match_count = match_count
+            self.search_results_truncated = (
+                match_count > self.model_admin.search_backend_results_limit)
+        return queryset.filter(pk__in=pks), False
+
+    def search_backend_pks(self, queryset, search_term):
+        """
+        Returns a `(pks, match_count)` tuple, where `pks` is a list of the
+        primary keys of the most relevant matches for `search_term` in
+        `queryset`, and `match_count` is the total number of matches, if
+        there are more than `search_backend_results_limit` (or `None`)
+        """
+        backend = get_search_backend(self.search_backend_name)
+        limit = self.model_admin.search_backend_results_limit
+
+        def search(search_queryset):
+            # Only primary keys are needed from the matching objects
+            results = backend.search(
+                search_term,
+                search_queryset.select_related(None).only('pk').order_by(),
+                order_by_relevance=True)
+            return results, [obj.pk for obj in results[:limit]]
+
+        try:
+            results, pks = search(queryset)
+        except (FieldError, FilterError):
+            # Some of the filters can't be applied by the backend, so they
+            # are only applied to the matches
+            results, pks = search(self.model._default_manager.all())
+
+        if len(pks) >= limit:
+            return pks, results.count()
+        return pks, None
 
     def lookup_allowed(self, lookup, value):
         # Check FKey lookups that are allowed, so that popups produced by
@@ -398,6 +577,7 @@ class IndexView(WMABaseView):
                     "Filtering by %s not allowed" % key)
 
         filter_specs = []
+        deferred_filters = False
         if self.list_filter:
             for list_filter in self.list_filter:
                 if callable(list_filter):
@@ -423,6 +603,13 @@ class IndexView(WMABaseView):
                         field_path = field
                         field = get_fields_from_path(self.model,
                                                      field_path)[-1]
+                    if self.defer_filter_specs and self.is_deferrable_filter(
+                        field, field_list_filter_class
+                    ):
+                        # Its parameters are left in lookup_params, and
+                        # applied as plain lookups
+                        deferred_filters = True
+                        continue
                     spec = field_list_filter_class(
                         field,
                         request,
@@ -450,7 +637,8 @@ class IndexView(WMABaseView):
                 use_distinct = (
                     use_distinct or lookup_needs_distinct(self.opts, key))
             return (
-                filter_specs, bool(filter_specs), lookup_params, use_distinct
+                filter_specs, bool(filter_specs) or deferred_filters,
+                lookup_params, use_distinct
             )
         except FieldDoesNotExist as e:
             six.reraise(
@@ -458,6 +646,101 @@ class IndexView(WMABaseView):
                 IncorrectLookupParameters(e),
                 sys.exc_info()[2])
 
+    @property
+    def defer_filter_specs(self):
+        """
+        Filter specs are only needed to render the filter sidebar. When that
+        is loaded separately (`list_filter_lazy`), those that simply filter by
+        their lookup parameters aren't created, as many of them query the
+        database just to list their choices.
+        """
+        return self.list_filter_lazy
+
+    def is_deferrable_filter(self, field, field_list_filter_class):
+        """
+        Returns a boolean indicating whether the filter for `field` only
+        filters by its lookup parameters (as `FieldListFilter` does), so the
+        parameters can be applied without creating the filter spec
+        """
+        if field_list_filter_class == self.flf_class.create:
+            # Find the class that `create()` would use for the field
+            for test, filter_class in self.flf_class._field_list_filters:
+                if test(field):
+                    field_list_filter_class = filter_class
+                    break
+            else:
+                return False
+        queryset = getattr(field_list_filter_class, 'queryset', None)
+        if queryset is None:
+            return False
+        return six.get_unbound_function(queryset) is (
+            six.get_unbound_function(FieldListFilter.queryset))
+
+    def get_filter_choices(self, spec):
+        """
+        Returns a list of choices for the supplied filter spec. When
+        `list_filter_counts` is enabled on the model_admin, each choice is
+        given a `count` value, indicating how many of the current results
+        match it.
+        """
+        choices = list(spec.choices(self))
+        if self.model_admin.list_filter_counts:
+            self.add_facet_counts(spec, choices)
+        return choices
+
+    def add_facet_counts(self, spec, choices):
+        """
+        Adds a `count` to each of the supplied choices for `spec`. The counts
+        for all choices are calculated together with a single grouped query.
+        Only filters that filter on a single lookup (such as those for
+        related, boolean and choice fields) are supported.
+        """
+        lookup_kwarg = getattr(spec, 'lookup_kwarg', None)
+        if not lookup_kwarg:
+            return
+        lookup_kwarg_isnull = getattr(spec, 'lookup_kwarg_isnull', None)
+        group_by = lookup_kwarg
+        if group_by.endswith(LOOKUP_SEP + 'exact'):
+            group_by = group_by[:-len(LOOKUP_SEP + 'exact')]
+        counts = get_facet_counts(
+            self.model_admin, lambda: self.get_facet_queryset(spec),
+            group_by, self.get_count_signature(
+                exclude=spec.expected_parameters()))
+        for choice in choices:
+            params = dict(parse_qsl(choice['query_string'].lstrip('?')))
+            if lookup_kwarg in params:
+                choice['count'] = counts.get(params[lookup_kwarg], 0)
+            elif lookup_kwarg_isnull and lookup_kwarg_isnull in params:
+                choice['count'] = counts.get(None, 0)
+
+    def get_facet_queryset(self, spec):
+        """
+        Returns the results for the current request as they would be without
+        `spec`'s own selection applied (as Django's admin does), so that the
+        counts for its choices show how many results selecting each of them
+        would give
+        """
+        excluded = spec.expected_parameters()
+        qs = self.apply_filters(
+            self.request, self.base_queryset,
+            [s for s in self.filter_specs if s is not spec],
+            dict((k, v) for k, v in self.remaining_lookup_params.items()
+                 if k not in excluded))
+        if not self.query:
+            return qs
+        if self.search_backend_name:
+            pks = self.search_backend_pks(qs, self.query)[0]
+            return qs.filter(pk__in=pks)
+        return self.get_search_results(self.request, qs, self.query)[0]
+
+    def get_filters_url(self):
+        """
+        Returns the URL of the view that renders the filter sidebar for the
+        current results (used when `list_filter_lazy` is True)
+        """
+        return reverse(get_url_name(self.opts, 'filters')) + (
+            self.get_query_string())
+
     def get_query_string(self, new_params=None, remove=None):
         if new_params is None:
             new_params = {}
@@ -591,22 +874,77 @@ class IndexView(WMABaseView):
         return ordering_fields
 
     def get_queryset(self, request):
-        # First, we collect all the declared list filters.
-        (self.filter_specs, self.has_filters, remaining_lookup_params,
-         filters_use_distinct) = self.get_filters(request)
+        """
+        Returns the filtered, searched and ordered queryset for the current
+        request. This is called once from `dispatch()`, and the result is
+        stored as `self.queryset`, along with `filter_specs`, `has_filters`,
+        `ordering` and `use_distinct`, which should be used instead of calling
+        this again.
+        """
+        # First, we collect all the declared list filters. Lookups that would
+        # require `distinct()` are applied as subqueries below, so the
+        # 'use_distinct' value from get_filters() isn't needed.
+        (self.filter_specs, self.has_filters, self.remaining_lookup_params,
+         _filters_use_distinct) = self.get_filters(request)
+
+        qs = self.apply_filters(
+            request, self.base_queryset, self.filter_specs,
+            self.remaining_lookup_params)
+
+        if not qs.query.select_related:
+            qs = self.apply_select_related(qs)
+
+        # Set ordering.
+        self.ordering = self.get_ordering(request, qs)
+        qs = qs.order_by(*self.ordering)
+
+        # Apply search results
+        qs, search_use_distinct = self.get_search_results(
+            request, qs, self.query)
 
-        # Then, we let every list filter modify the queryset to its liking.
-        qs = self.get_base_queryset(request)
-        for filter_spec in self.filter_specs:
+        # Remove duplicates from results, if necessary
+        self.use_distinct = search_use_distinct
+        if self.use_distinct:
+            return qs.distinct()
+        else:
+            return qs
+
+    def apply_filters(self, request, qs, filter_specs, lookup_params):
+        """
+        Returns `qs` filtered by the supplied filter specs, and then by the
+        remaining lookup parameters from the query string
+        """
+        # We let every list filter modify the queryset to its liking.
+        # Filters on multi-valued relationships are applied to a separate
+        # queryset, which is then used as a subquery, so that no duplicate
+        # rows can be introduced.
+        for filter_spec in filter_specs:
+            field_path = getattr(filter_spec, 'field_path', None)
+            if field_path and lookup_needs_distinct(self.opts, field_path):
+                new_qs = filter_spec.queryset(
+                    request, self.model._default_manager.get_queryset())
+                if new_qs is not None:
+                    qs = qs.filter(pk__in=new_qs.values('pk'))
+                continue
             new_qs = filter_spec.queryset(request, qs)
             if new_qs is not None:
                 qs = new_qs
 
+        remaining_lookup_params = dict(lookup_params)
+        multi_valued_lookup_params = {}
+        for key in list(remaining_lookup_params):
+            if lookup_needs_distinct(self.opts, key):
+                multi_valued_lookup_params[key] = (
+                    remaining_lookup_params.pop(key))
+
         try:
             # Finally, we apply the remaining lookup parameters from the query
             # string (i.e. those that haven't already been processed by the
             # filters).
             qs = qs.filter(**remaining_lookup_params)
+            if multi_valued_lookup_params:
+                qs = qs.filter(pk__in=self.get_pk_subquery(
+                    **multi_valued_lookup_params))
         except (SuspiciousOperation, ImproperlyConfigured):
             # Allow certain types of errors to be re-raised as-is so that the
             # caller can treat them in a special way.
@@ -618,23 +956,7 @@ class IndexView(WMABaseView):
             # are not in the correct type, so we might get FieldError,
             # ValueError, ValidationError, or ?.
             raise IncorrectLookupParameters(e)
-
-        if not qs.query.select_related:
-            qs = self.apply_select_related(qs)
-
-        # Set ordering.
-        ordering = self.get_ordering(request, qs)
-        qs = qs.order_by(*ordering)
-
-        # Apply search results
-        qs, search_use_distinct = self.get_search_results(
-            request, qs, self.query)
-
-        # Remove duplicates from results, if necessary
-        if filters_use_distinct | search_use_distinct:
-            return qs.distinct()
-        else:
-            return qs
+        return qs
 
     def apply_select_related(self, qs):
         if self.select_related is True:
@@ -644,8 +966,11 @@ class IndexView(WMABaseView):
             if self.has_related_field_in_list_display():
                 return qs.select_related()
 
+        extra = list(self.model_admin.get_extra_select_related(self.request))
         if self.select_related:
-            return qs.select_related(*self.select_related)
+            return qs.select_related(*(list(self.select_related) + extra))
+        if extra:
+            return qs.select_related(*extra)
         return qs
 
     def has_related_field_in_list_display(self):
@@ -659,18 +984,99 @@ class IndexView(WMABaseView):
                     return True
         return False
 
-    def get_context_data(self, request, *args, **kwargs):
-        user = request.user
-        all_count = self.get_base_queryset(request).count()
-        queryset = self.get_queryset(request)
-        result_count = queryset.count()
-        has_add_permission = self.permission_helper.has_add_permission(user)
-        paginator = Paginator(queryset, self.items_per_page)
+    def use_keyset_pagination(self, queryset):
+        """
+        Returns a boolean indicating whether results should be paginated using
+        a cursor (see `KeysetPaginator`) instead of page numbers. Keyset
+        pagination is only used when enabled on the model_admin, and when the
+        resolved ordering consists of plain field references only.
+        """
+        if self.pagination_mode == 'keyset':
+            return KeysetPaginator.supports_queryset(queryset)
+        if self.pagination_mode != 'offset':
+            raise ImproperlyConfigured(
+                u"The `pagination_mode` attribute on your `%s` class must be "
+                "either 'offset' or 'keyset'." %
+                self.model_admin.__class__.__name__)
+        return False
 
+    def paginate_queryset(self, queryset, result_count,
+                          keyset_pagination=False):
+        """
+        Returns a `(paginator, page_obj)` tuple for the current request
+        """
+        if keyset_pagination:
+            paginator = KeysetPaginator(queryset, self.items_per_page)
+            try:
+                return paginator, paginator.page(self.cursor)
+            except InvalidCursor:
+                return paginator, paginator.page()
+
+        paginator = CountedPaginator(
+            queryset, self.items_per_page, result_count)
         try:
-            page_obj = paginator.page(self.page_num + 1)
+            return paginator, paginator.page(self.page_num + 1)
         except InvalidPage:
-            page_obj = paginator.page(1)
+            return paginator, paginator.page(1)
+
+    def is_filtered(self):
+        """
+        Returns a boolean indicating whether any filters or search terms are
+        being applied to the results
+        """
+        return bool(self.get_filters_params() or self.query)
+
+    def get_count_signature(self, filtered=True, exclude=()):
+        """
+        Returns a value identifying the filters and search terms applied to
+        the results (or the unfiltered results, if `filtered` is False),
+        which is used to cache counts when the model_admin's `count_strategy`
+        is 'cached'. Filter parameters named in `exclude` are left out. If
+        your model_admin's `get_queryset` varies by user, you should override
+        this to include the user too.
+        """
+        signature = [[], '']
+        if filtered:
+            signature = [sorted(
+                (k, v) for k, v in self.get_filters_params().items()
+                if k not in exclude), self.query]
+        if self.editable_pages_only:
+            signature.append(self.request.user.pk)
+        return signature
+
+    _counts = None
+
+    def get_counts(self, request, queryset):
+        """
+        Returns a tuple of `RowCount` values for the unfiltered results and
+        the results for the current request. Only one count is made when no
+        filters or search terms are being applied, and the counts are only
+        made once per request.
+        """
+        if self._counts is not None and self._counts[0] is queryset:
+            return self._counts[1]
+        counter = RowCounter(self.model_admin)
+        all_count = counter.count(
+            self.base_queryset, self.get_count_signature(filtered=False))
+        if not self.is_filtered():
+            counts = all_count, all_count
+        else:
+            counts = all_count, counter.count(
+                queryset, self.get_count_signature())
+        self._counts = queryset, counts
+        return counts
+
+    def get_context_data(self, request, *args, **kwargs):
+        user = request.user
+        queryset = self.queryset
+        all_count, result_count = self.get_counts(request, queryset)
+        has_add_permission = self.permission_helper.has_add_permission(user)
+        keyset_pagination = self.use_keyset_pagination(queryset)
+        paginator, page_obj = self.paginate_queryset(
+            queryset, result_count, keyset_pagination)
+        # Evaluate the page's results once, so that anything needed to render
+        # them can be fetched in bulk (see `prefetch_for_results()`)
+        page_obj.object_list = list(page_obj.object_list)
 
         context = {
             'view': self,
@@ -679,7 +1085,9 @@ class IndexView(WMABaseView):
             'paginator': paginator,
             'page_obj': page_obj,
             'object_list': page_obj.object_list,
+            'keyset_pagination': keyset_pagination,
             'has_add_permission': has_add_permission,
+            'export_buttons': self.get_export_buttons(),
         }
 
         if self.is_pagemodel:
@@ -693,17 +1101,318 @@ class IndexView(WMABaseView):
             })
         return context
 
+    def prefetch_for_results(self, objects):
+        """
+        Fetches anything needed to render rows for the supplied results (e.g.
+        to check permissions on them, or display their thumbnails) in bulk.
+        Called by the `result_list` template tag, with just the results whose
+        rows aren't already in the row cache.
+        """
+        if objects:
+            self.permission_helper.prefetch_object_permissions(
+                self.request.user, objects)
+            self.model_admin.prefetch_for_list_display(self.request, objects)
+
+    def get_export_buttons(self):
+        """
+        Returns a list of buttons linking to exports of the current results,
+        for each format in `export_formats` on the model_admin
+        """
+        buttons = []
+        export_url = None
+        in_background = self.model_admin.export_in_background
+        for export_format in self.model_admin.export_formats:
+            if export_url is None:
+                export_url = reverse(get_url_name(
+                    self.opts, 'export_job' if in_background else 'export'))
+            buttons.append({
+                'url': export_url + self.get_query_string(
+                    {EXPORT_FORMAT_VAR: export_format}),
+                'label': _('Download %s') % export_format.upper(),
+                'classname': 'button bicolor icon icon-download',
+                'title': _('Download these results as %s') % (
+                    export_format.upper()),
+                # Background exports are started by POSTing to the URL
+                'method': 'post' if in_background else 'get',
+            })
+        return buttons
+
+    def get_validator_data(self, request):
+        """
+        The results only change when an object is saved (updating the latest
+        value of `last_modified_field`, which should be indexed) or deleted.
+        Deletions are detected by the model's count 'generation', which
+        changes whenever an object is saved or deleted. When the
+        model_admin's `count_strategy` is 'exact', the count is included too
+        (and reused when the page is rendered).
+        """
+        last_modified = self.queryset.order_by().aggregate(
+            last_modified=models.Max(self.model_admin.last_modified_field),
+        )['last_modified']
+        data = [get_generation(self.model), request.get_full_path()]
+        if self.model_admin.count_strategy == COUNT_EXACT:
+            data.append(int(self.get_counts(request, self.queryset)[1]))
+        return last_modified, data
+
     def get(self, request, *args, **kwargs):
-        context = self.get_context_data(request, *args, **kwargs)
         if request.session.get('return_to_index_url'):
             del(request.session['return_to_index_url'])
+        if len(get_messages(request)):
+            # Messages are only displayed when the page is rendered
+            return self.render_index(request, *args, **kwargs)
+        return self.conditional_response(
+            request, lambda: self.render_index(request, *args, **kwargs))
+
+    def render_index(self, request, *args, **kwargs):
+        context = self.get_context_data(request, *args, **kwargs)
         return self.render_to_response(context)
 
     def get_template_names(self):
         return self.model_admin.get_index_template()
 
 
-class InspectView(ObjectSpecificView):
+class IndexFiltersView(IndexView):
+    """
+    Renders just the filter sidebar for IndexView, for the filters/search
+    terms in the query string. Used to load the sidebar separately from the
+    rest of the index page, when `list_filter_lazy` is True on the
+    model_admin.
+    """
+    defer_filter_specs = False
+
+    def get(self, request, *args, **kwargs):
+        return self.render_to_response({'view': self})
+
+    def get_template_names(self):
+        return ['wagtailmodeladmin/includes/filters.html']
+
+
+class IndexAPIView(IndexView):
+    """
+    Returns the same filtered, searched and ordered results as IndexView, as
+    JSON. Values for `list_display` items that are concrete model fields are
+    included (a subset can be requested by supplying a comma-separated list
+    of names in the `fields` parameter), and are read directly with
+    `values()`, so no model instances are created. Results are paginated
+    using cursors, and links to the next and previous pages are included.
+    """
+
+    def get_filters_params(self, params=None):
+        lookup_params = super(IndexAPIView, self).get_filters_params(params)
+        if FIELDS_VAR in lookup_params:
+            del lookup_params[FIELDS_VAR]
+        return lookup_params
+
+    def get_api_fields(self, request):
+        """
+        Returns a list of field names to include values for in the results.
+        The primary key is always included as `pk`.
+        """
+        available = []
+        for field_name in self.list_display:
+            try:
+                field = self.opts.get_field(field_name)
+            except FieldDoesNotExist:
+                continue
+            if field.many_to_many or not field.concrete:
+                # Values can't be read for these without duplicating rows
+                continue
+            if field.name not in available:
+                available.append(field.name)
+        requested = request.GET.get(FIELDS_VAR)
+        if requested:
+            available = [
+                f for f in requested.split(',') if f in available]
+        return ['pk'] + [f for f in available if f != self.opts.pk.name]
+
+    def get_api_url(self, cursor):
+        if cursor is None:
+            return None
+        return reverse(get_url_name(self.opts, 'api')) + (
+            self.get_query_string({CURSOR_VAR: cursor}))
+
+    def get(self, request, *args, **kwargs):
+        queryset = self.queryset
+        if not KeysetPaginator.supports_queryset(queryset):
+            return JsonResponse({
+                'error': 'The ordering of these results is not supported.',
+            }, status=400)
+        paginator = KeysetPaginator(queryset, self.items_per_page)
+        fields = self.get_api_fields(request)
+        try:
+            page_obj = paginator.page_values(fields, self.cursor)
+        except InvalidCursor:
+            return JsonResponse({'error': 'Invalid cursor.'}, status=400)
+        return JsonResponse({
+            'results': page_obj.object_list,
+            'next': self.get_api_url(page_obj.next_cursor()),
+            'previous': self.get_api_url(page_obj.previous_cursor()),
+            'search_results_truncated': self.search_results_truncated,
+        })
+
+
+class ExportView(IndexView):
+    """
+    Streams the same filtered, searched and ordered results as IndexView as
+    a CSV or JSON lines file, depending on the `format` parameter. Columns are
+    taken from the model_admin's `get_export_fields()`. Rows are fetched in
+    chunks of `export_chunk_size`, so memory use stays constant, however
+    many rows are exported.
+    """
+
+    def get_filters_params(self, params=None):
+        lookup_params = super(ExportView, self).get_filters_params(params)
+        if EXPORT_FORMAT_VAR in lookup_params:
+            del lookup_params[EXPORT_FORMAT_VAR]
+        return lookup_params
+
+    def get_export_fields(self):
+        return self.model_admin.get_export_fields(self.request)
+
+    def get_export_format(self, request):
+        export_format = request.GET.get(EXPORT_FORMAT_VAR)
+        if (
+            export_format not in self.model_admin.export_formats or
+            export_format not in EXPORT_CONTENT_TYPES
+        ):
+            raise Http404
+        return export_format
+
+    def iter_objects(self):
+        return iter_queryset_in_chunks(
+            self.queryset, self.model_admin.export_chunk_size)
+
+    def get(self, request, *args, **kwargs):
+        export_format = self.get_export_format(request)
+        renderer = ExportRenderer(
+            self.model_admin, self.get_export_fields(), export_format)
+        response = StreamingHttpResponse(
+            renderer.iter_lines(self.iter_objects()),
+            content_type=EXPORT_CONTENT_TYPES[export_format])
+        response['Content-Disposition'] = 'attachment; filename="%s.%s"' % (
+            self.opts.model_name, export_format)
+        return response
+
+
+class ExportJobView(ExportView):
+    """
+    Creates an `ExportJob` for the current results (in the format given by
+    the `format` parameter) and hands it to the model_admin's export job
+    runner, before redirecting to `ExportJobStatusView` to follow its
+    progress. Used instead of `ExportView` when `export_in_background` is
+    True on the model_admin.
+    """
+
+    def get(self, request, *args, **kwargs):
+        raise Http404
+
+    def post(self, request, *args, **kwargs):
+        export_format = self.get_export_format(request)
+        job = ExportJob.create(
+            self.model_admin, self.queryset, self.get_export_fields(),
+            export_format, request.user)
+        self.model_admin.get_export_job_runner().submit(job)
+        return redirect(get_export_job_status_url(self.opts, job))
+
+
+def get_export_job_status_url(opts, job):
+    return '%s?%s' % (
+        reverse(get_url_name(opts, 'export_status')),
+        urlencode({'job': job.id}))
+
+
+class ExportJobStatusView(WMABaseView):
+    """
+    Reports the progress of the `ExportJob` identified by the `job` parameter
+    (as JSON for AJAX requests), and serves the finished file when the
+    `download` parameter is present. Jobs can only be seen by the user that
+    created them.
+    """
+    page_title = _('Exporting')
+
+    @method_decorator(login_required)
+    def dispatch(self, request, *args, **kwargs):
+        if not self.permission_helper.has_list_permission(request.user):
+            return permission_denied_response(request)
+        self.job = ExportJob.get(request.GET.get('job'))
+        if self.job is None:
+            raise Http404
+        self.progress = self.job.get_progress()
+        if self.progress['user_id'] != request.user.pk:
+            raise Http404
+        return super(ExportJobStatusView, self).dispatch(
+            request, *args, **kwargs)
+
+    def get_download_url(self):
+        return get_export_job_status_url(self.opts, self.job) + '&download=1'
+
+    def get(self, request, *args, **kwargs):
+        progress = self.progress
+        complete = progress['status'] == JOB_COMPLETE
+        if request.GET.get('download'):
+            if not complete:
+                raise Http404
+            response = FileResponse(
+                open(self.job.get_output_path(), 'rb'),
+                content_type=EXPORT_CONTENT_TYPES[progress['format']])
+            response['Content-Disposition'] = (
+                'attachment; filename="%s"' % progress['filename'])
+            return response
+
+        if request.is_ajax():
+            return JsonResponse({
+                'status': progress['status'],
+                'chunks': progress['chunks'],
+                'completed_chunks': progress['completed_chunks'],
+                'download_url': self.get_download_url() if complete else None,
+            })
+        return self.render_to_response({
+            'view': self,
+            'progress': progress,
+            'finished': progress['status'] in (JOB_COMPLETE, JOB_FAILED),
+            'download_url': self.get_download_url() if complete else None,
+        })
+
+    def get_template_names(self):
+        return self.model_admin.get_export_job_template()
+
+
+class FilterAutocompleteView(WMABaseView):
+    """
+    Returns JSON search results for list filters that support searching for
+    values (e.g. `HighCardinalityRelatedFieldListFilter`). The filter is
+    identified by the `field` parameter, and the search term by `term`.
+    """
+
+    @method_decorator(login_required)
+    def dispatch(self, request, *args, **kwargs):
+        if not self.permission_helper.has_list_permission(request.user):
+            return permission_denied_response(request)
+        return super(FilterAutocompleteView, self).dispatch(
+            request, *args, **kwargs)
+
+    def get_filter_class(self, request, field_path):
+        for list_filter in self.model_admin.get_list_filter(request):
+            if not isinstance(list_filter, (tuple, list)):
+                continue
+            field, filter_class = list_filter
+            if field == field_path and hasattr(
+                filter_class, 'get_autocomplete_results'
+            ):
+                return filter_class
+        raise Http404
+
+    def get(self, request, *args, **kwargs):
+        field_path = request.GET.get('field', '')
+        filter_class = self.get_filter_class(request, field_path)
+        field = get_fields_from_path(self.model, field_path)[-1]
+        results = filter_class.get_autocomplete_results(
+            field, request.GET.get('term', ''),
+            self.model_admin.get_index_queryset(request), field_path)
+        return JsonResponse({'results': results})
+
+
+class InspectView(ConditionalGetMixin, ObjectSpecificView):
 
     page_title = _('Inspecting')
 
@@ -769,7 +1478,7 @@ class InspectView(ObjectSpecificView):
 
                 if (
                     field_type == 'ForeignKey' and
-                    field.related_model == Document
+                    field.related_model == get_document_model()
                 ):
                     # The field is a document
                     return self.get_document_field_display(field_name, field)
@@ -787,21 +1496,45 @@ class InspectView(ObjectSpecificView):
         """ Render an image """
         image = getattr(self.instance, field_name)
         if image:
-            fltr, _ = Filter.objects.get_or_create(spec='max-400x400')
-            rendition = image.get_rendition(fltr)
-            return rendition.img_tag
+            prefetch_renditions([image], INSPECT_IMAGE_FILTER_SPEC)
+            return get_rendition(image, INSPECT_IMAGE_FILTER_SPEC).img_tag
         return self.model_admin.get_empty_value_display()
 
+    def get_document_file_size(self, document):
+        """
+        Return the size of `document`'s file, without asking the storage
+        backend for it (which may be remote) where possible. A value stored
+        on the document (as `file_size`) is used if present. Otherwise, sizes
+        are cached by file name, which changes whenever a new file is
+        uploaded.
+        """
+        file_size = getattr(document, 'file_size', None)
+        if file_size is not None:
+            return file_size
+        key = 'wagtailmodeladmin:document_size:%s' % hashlib.md5(
+            force_bytes(document.file.name)).hexdigest()
+        file_size = cache.get(key)
+        if file_size is None:
+            try:
+                file_size = document.file.size
+            except (IOError, OSError):
+                return None
+            cache.set(key, file_size, None)
+        return file_size
+
     def get_document_field_display(self, field_name, field):
         """ Render a link to a document """
         document = getattr(self.instance, field_name)
         if document:
+            meta = [document.file_extension.upper()]
+            file_size = self.get_document_file_size(document)
+            if file_size is not None:
+                meta.append(filesizeformat(file_size))
             return mark_safe(
-                '<a href="%s">%s <span class="meta">(%s, %s)</span></a>' % (
+                '<a href="%s">%s <span class="meta">(%s)</span></a>' % (
                     document.url,
                     document.title,
-                    document.file_extension.upper(),
-                    filesizeformat(document.file.size),
+                    ', '.join(meta),
                 )
             )
         return self.model_admin.get_empty_value_display()
@@ -840,6 +1573,18 @@ class InspectView(ObjectSpecificView):
             'instance': self.instance,
         }
 
+    def get_validator_data(self, request):
+        last_modified = getattr(
+            self.instance, self.model_admin.last_modified_field)
+        return last_modified, [self.instance.pk]
+
+    def get(self, request, *args, **kwargs):
+        if len(get_messages(request)):
+            return super(InspectView, self).get(request, *args, **kwargs)
+        return self.conditional_response(
+            request,
+            lambda: super(InspectView, self).get(request, *args, **kwargs))
+
     def get_template_names(self):
         return self.model_admin.get_inspect_template()
 
@@ -881,21 +1626,83 @@ class CreateView(WMAFormView):
 
 
 class ChooseParentView(WMABaseView):
+    """
+    Allows the parent page to be chosen for a new page, from the pages the
+    user can add this type of page to. Candidates are paginated (by
+    `choose_parent_per_page` on the model_admin), and can be searched by
+    title using the `q` parameter.
+    """
+
     def dispatch(self, request, *args, **kwargs):
         if not self.permission_helper.has_add_permission(request.user):
             return permission_denied_response(request)
+        self.query = request.GET.get(SEARCH_VAR, '')
+        try:
+            self.page_num = int(request.GET.get(PAGE_VAR, 0))
+        except ValueError:
+            self.page_num = 0
         return super(ChooseParentView, self).dispatch(request, *args, **kwargs)
 
     def get_page_title(self):
         return _('Add %s') % self.model_name
 
-    def get_form(self, request):
-        parents = self.permission_helper.get_valid_parent_pages(request.user)
-        return ParentChooserForm(parents, request.POST or None)
+    def get_valid_parents(self, request):
+        return self.permission_helper.get_valid_parent_pages(request.user)
+
+    def get_parents_queryset(self, request):
+        """
+        Returns the valid parents matching the search term (if any), in tree
+        order
+        """
+        qs = self.get_valid_parents(request)
+        for bit in self.query.split():
+            qs = qs.filter(title__icontains=bit)
+        return qs.order_by('path')
+
+    def paginate_parents(self, queryset):
+        paginator = Paginator(
+            queryset, self.model_admin.choose_parent_per_page)
+        try:
+            page_obj = paginator.page(self.page_num + 1)
+        except InvalidPage:
+            page_obj = paginator.page(1)
+        return paginator, page_obj
+
+    def get_page_url(self, page_num, url=''):
+        """
+        Returns a URL for the page of candidates with the supplied (zero-based)
+        number, for the current search term
+        """
+        params = {PAGE_VAR: page_num}
+        if self.query:
+            params[SEARCH_VAR] = self.query
+        return '%s?%s' % (url, urlencode(params))
+
+    def get_form(self, request, choices_qs=None):
+        parents = self.get_valid_parents(request)
+        return ParentChooserForm(
+            parents, request.POST or None, choices_qs=choices_qs)
+
+    def get_context_data(self, request):
+        paginator, page_obj = self.paginate_parents(
+            self.get_parents_queryset(request))
+        form = self.get_form(request, choices_qs=page_obj.object_list)
+        return {
+            'view': self,
+            'form': form,
+            'paginator': paginator,
+            'page_obj': page_obj,
+            'search_var': SEARCH_VAR,
+            'previous_url': self.get_page_url(
+                page_obj.previous_page_number() - 1
+            ) if page_obj.has_previous() else None,
+            'next_url': self.get_page_url(
+                page_obj.next_page_number() - 1
+            ) if page_obj.has_next() else None,
+        }
 
     def get(self, request, *args, **kwargs):
-        form = self.get_form(request)
-        context = {'view': self, 'form': form}
+        context = self.get_context_data(request)
         return render(request, self.get_template(), context)
 
     def post(self, request, *args, **kargs):
@@ -904,13 +1711,55 @@ class ChooseParentView(WMABaseView):
             parent = form.cleaned_data['parent_page']
             return redirect(PAGES_CREATE_URL_NAME, self.opts.app_label,
                             self.opts.model_name, quote(parent.pk))
-        context = {'view': self, 'form': form}
+        # Rebuild the form (with the same data) to render only the current
+        # page of choices
+        context = self.get_context_data(request)
         return render(request, self.get_template(), context)
 
     def get_template(self):
         return self.model_admin.get_choose_parent_template()
 
 
+class ChooseParentSearchView(ChooseParentView):
+    """
+    Returns a page of candidate parent pages as JSON, for the search term in
+    the `q` parameter. Each result includes the titles of the page's
+    ancestors, for display as a breadcrumb.
+    """
+
+    def get(self, request, *args, **kwargs):
+        paginator, page_obj = self.paginate_parents(
+            self.get_parents_queryset(request))
+        pages = list(page_obj.object_list)
+        titles = get_ancestor_titles(pages)
+        steplen = Page.steplen
+        results = []
+        for page in pages:
+            results.append({
+                'id': page.pk,
+                'title': page.title,
+                'ancestors': [
+                    titles[page.path[:depth * steplen]]
+                    for depth in range(2, page.depth)
+                    if page.path[:depth * steplen] in titles
+                ],
+            })
+        url = reverse(get_url_name(self.opts, 'choose_parent_search'))
+        return JsonResponse({
+            'count': paginator.count,
+            'results': results,
+            'next': self.get_page_url(
+                page_obj.next_page_number() - 1, url
+            ) if page_obj.has_next() else None,
+            'previous': self.get_page_url(
+                page_obj.previous_page_number() - 1, url
+            ) if page_obj.has_previous() else None,
+        })
+
+    def post(self, request, *args, **kwargs):
+        raise Http404
+
+
 class EditView(ObjectSpecificView, CreateView):
     page_title = _('Editing')
 
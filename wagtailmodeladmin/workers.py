@@ -0,0 +1,15 @@
+from django.apps import apps
+
+# Worker processes import this module before Django has been set up, so it
+# mustn't import anything that needs the app registry to be ready
+
+
+def init_worker():
+    """
+    The `initializer` for pools of worker processes. Workers that weren't
+    forked from a process with Django already set up (e.g. those started
+    with the 'spawn' method) need to set it up for themselves.
+    """
+    if not apps.ready:
+        import django
+        django.setup()